@@ -0,0 +1,75 @@
+"""Compare dispatch planning against a naive pairwise implementation.
+
+Run from the project root:
+
+    python -m benchmarks.dispatch --orders 5000
+"""
+import argparse
+import math
+import random
+import time
+
+from services.dispatch import EARTH_RADIUS_KM, plan_routes
+
+
+def haversine(a, b):
+    lat1, lon1 = map(math.radians, a)
+    lat2, lon2 = map(math.radians, b)
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def plan_routes_naive(orders, depot, max_stops=5, max_radius_km=3.0):
+    # same greedy batching, but every seed is compared against every other order
+    remaining = sorted(orders, key=lambda o: -haversine(depot, (o[1], o[2])))
+    routes = []
+    while remaining:
+        seed = remaining[0]
+        nearby = sorted(
+            (haversine((seed[1], seed[2]), (o[1], o[2])), i)
+            for i, o in enumerate(remaining)
+        )
+        batch = [i for d, i in nearby if d <= max_radius_km][:max_stops]
+        routes.append([remaining[i][0] for i in batch])
+        taken = set(batch)
+        remaining = [o for i, o in enumerate(remaining) if i not in taken]
+    return routes
+
+
+def seed_orders(count, depot, spread_km=15.0):
+    rng = random.Random(42)
+    deg = spread_km / 111.0
+    return [
+        (i, depot[0] + rng.uniform(-deg, deg), depot[1] + rng.uniform(-deg, deg))
+        for i in range(count)
+    ]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--max-stops", type=int, default=5)
+    parser.add_argument("--radius", type=float, default=3.0)
+    parser.add_argument("--skip-naive", action="store_true")
+    args = parser.parse_args()
+
+    depot = (6.4541, 3.3947)
+    orders = seed_orders(args.orders, depot)
+
+    routes, elapsed = timed(plan_routes, orders, depot, args.max_stops, args.radius)
+    print(f"grid index:  {len(routes):6d} routes in {elapsed * 1000:9.1f} ms")
+
+    if not args.skip_naive:
+        naive, elapsed_naive = timed(plan_routes_naive, orders, depot, args.max_stops, args.radius)
+        print(f"naive:       {len(naive):6d} routes in {elapsed_naive * 1000:9.1f} ms")
+        print(f"speedup:     {elapsed_naive / elapsed:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Report password hashes per second for each scheme and cost on this machine.
+
+Also prints the cost that startup calibration would pick for the target
+verify time:
+
+    python -m benchmarks.hashing --target-ms 250
+"""
+import argparse
+import time
+from services.hashing import COST_LIMITS, calibrate, make_context
+
+
+def hashes_per_second(context, seconds):
+    stored = context.hash("benchmark password")
+    done = 0
+    began = time.perf_counter()
+    while time.perf_counter() - began < seconds:
+        context.verify("benchmark password", stored)
+        done += 1
+    return done / (time.perf_counter() - began)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schemes", nargs="+", default=list(COST_LIMITS))
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--max-ms", type=float, default=1000.0, help="stop raising the cost past this verify time")
+    parser.add_argument("--seconds", type=float, default=2.0, help="measuring time per cost")
+    parser.add_argument("--argon2-memory-kib", type=int, default=65536)
+    args = parser.parse_args()
+
+    for scheme in args.schemes:
+        low, high = COST_LIMITS[scheme]
+        print(f"{scheme}:")
+        for cost in range(low, high + 1):
+            rate = hashes_per_second(make_context(scheme, cost, args.argon2_memory_kib), args.seconds)
+            print(f"  cost {cost:2d}: {rate:8.1f} hashes/s  {1000 / rate:8.1f} ms")
+            if 1000 / rate > args.max_ms:
+                break
+
+        cost, seconds = calibrate(scheme, args.target_ms / 1000, args.argon2_memory_kib)
+        print(f"  calibrated for {args.target_ms:.0f} ms: cost {cost} ({seconds * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
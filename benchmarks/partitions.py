@@ -0,0 +1,102 @@
+"""Compare a month-bounded staff query on the partitioned orders table
+against the same data in an unpartitioned copy.
+
+Needs a Postgres database (DATABASE_URL or the POSTGRES_* variables). The
+script seeds its own rows, so point it at a scratch database:
+
+    python -m benchmarks.partitions --rows 2000000
+"""
+import argparse
+import time
+from datetime import date
+from sqlalchemy import text
+from database import get_engine
+from migrations import add_months, month_start, run_migrations, ensure_order_partitions
+
+
+SEED_SQL = """
+INSERT INTO {table} (quantity, order_status, pizza_size, user_id, unit_price, total_price, created_at)
+SELECT 1 + g % 5,
+       (ARRAY['pending', 'processing', 'shipped', 'delivered', 'cancelled'])[1 + g % 5]::orderstatus,
+       (ARRAY['small', 'medium', 'large', 'extra_large'])[1 + g % 4]::pizzasizes,
+       :user_id,
+       1000,
+       1000 * (1 + g % 5),
+       now() - random() * make_interval(days => :days)
+FROM generate_series(1, :rows) AS g
+"""
+
+QUERY_SQL = """
+SELECT order_status, count(*), sum(total_price)
+FROM {table}
+WHERE created_at >= :start AND created_at < :end AND deleted_at IS NULL
+GROUP BY order_status
+"""
+
+
+def timed_query(conn, table, start, end, repeat):
+    best = None
+    for _ in range(repeat):
+        began = time.perf_counter()
+        conn.execute(text(QUERY_SQL.format(table=table)), {"start": start, "end": end}).fetchall()
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def scanned_relations(conn, table, start, end):
+    plan = conn.execute(
+        text("EXPLAIN " + QUERY_SQL.format(table=table)), {"start": start, "end": end}
+    ).scalars().all()
+    return sum(1 for line in plan if " on " in line and "Scan" in line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--months", type=int, default=24, help="how far back seeded orders go")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("the partition benchmark needs Postgres")
+
+    today = date.today()
+    first_month = add_months(month_start(today), -args.months)
+    run_migrations(engine)
+    ensure_order_partitions(engine, since=first_month)
+
+    with engine.begin() as conn:
+        if not args.skip_seed:
+            user_id = conn.execute(text(
+                "INSERT INTO users (username, email, first_name, last_name, password, is_staff, is_active) "
+                "VALUES ('bench', 'bench@example.com', 'Bench', 'Mark', '-', false, true) "
+                "ON CONFLICT (username) DO UPDATE SET username = EXCLUDED.username RETURNING id"
+            )).scalar()
+
+            conn.execute(text("DROP TABLE IF EXISTS orders_unpartitioned"))
+            conn.execute(text("CREATE TABLE orders_unpartitioned (LIKE orders INCLUDING DEFAULTS)"))
+            conn.execute(text("CREATE INDEX ON orders_unpartitioned (created_at)"))
+
+            began = time.perf_counter()
+            params = {"user_id": user_id, "rows": args.rows, "days": (today - first_month).days}
+            conn.execute(text(SEED_SQL.format(table="orders")), params)
+            conn.execute(text("INSERT INTO orders_unpartitioned SELECT * FROM orders"))
+            print(f"seeded {args.rows} rows in {time.perf_counter() - began:.1f} s")
+
+        conn.execute(text("ANALYZE orders"))
+        conn.execute(text("ANALYZE orders_unpartitioned"))
+
+    start = add_months(month_start(today), -1)
+    end = month_start(today)
+    with engine.connect() as conn:
+        for table in ("orders", "orders_unpartitioned"):
+            elapsed = timed_query(conn, table, start, end, args.repeat)
+            relations = scanned_relations(conn, table, start, end)
+            print(f"{table:22s} {elapsed * 1000:9.1f} ms  ({relations} relation(s) scanned)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Time the staff customer order search against a large users table.
+
+Seeds ``--users`` customers, one order for every ``--orders-every`` of
+them, builds the search index and reports p50/p95 latency per query. Works
+on Postgres and SQLite; point it at a scratch database:
+
+    python -m benchmarks.search --users 1000000
+"""
+import argparse
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from database import get_engine
+from migrations import ensure_search_indexes, run_migrations
+from services.search import search_backend, search_orders
+
+
+FIRST_NAMES = ["John", "Jane", "Maria", "Ahmed", "Chen", "Olivia", "Tunde", "Sofia", "Liam", "Amara"]
+LAST_NAMES = ["Smith", "Johnson", "Okafor", "Garcia", "Nguyen", "Müller", "Rossi", "Kowalski", "Adeyemi", "Brown",
+              "Williams", "Silva", "Kim"]
+DOMAINS = ["example.com", "mail.org", "pizza.io", "builder.net"]
+
+DEFAULT_QUERIES = ["smith", "john smith", "okafor", "user4242", "builder.net", "jane.nguyen1", "nomatch"]
+
+PG_USERS_SQL = """
+INSERT INTO users (username, email, first_name, last_name, password, is_staff, is_active)
+SELECT 'user' || g,
+       lower(f.name) || '.' || lower(l.name) || g || '@' || d.name,
+       f.name, l.name, '-', false, true
+FROM generate_series(1, :users) AS g
+CROSS JOIN LATERAL (SELECT (:first_names)[1 + g % :first_count] AS name) AS f
+CROSS JOIN LATERAL (SELECT (:last_names)[1 + g % :last_count] AS name) AS l
+CROSS JOIN LATERAL (SELECT (:domains)[1 + g % :domain_count] AS name) AS d
+"""
+
+ORDERS_SQL = """
+INSERT INTO orders (quantity, order_status, pizza_size, user_id, created_at)
+SELECT 1, :status, :size, id, :now FROM users WHERE id % :every = 0
+"""
+
+
+def user_rows(count):
+    for g in range(1, count + 1):
+        first = FIRST_NAMES[g % len(FIRST_NAMES)]
+        last = LAST_NAMES[g % len(LAST_NAMES)]
+        domain = DOMAINS[g % len(DOMAINS)]
+        yield {
+            "username": f"user{g}",
+            "email": f"{first.lower()}.{last.lower()}{g}@{domain}",
+            "first_name": first,
+            "last_name": last,
+        }
+
+
+def seed(engine, users, orders_every):
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            conn.execute(text(PG_USERS_SQL), {
+                "users": users,
+                "first_names": FIRST_NAMES, "first_count": len(FIRST_NAMES),
+                "last_names": LAST_NAMES, "last_count": len(LAST_NAMES),
+                "domains": DOMAINS, "domain_count": len(DOMAINS),
+            })
+        else:
+            insert = text(
+                "INSERT INTO users (username, email, first_name, last_name, password, is_staff, is_active) "
+                "VALUES (:username, :email, :first_name, :last_name, '-', 0, 1)"
+            )
+            batch = []
+            for row in user_rows(users):
+                batch.append(row)
+                if len(batch) == 10_000:
+                    conn.execute(insert, batch)
+                    batch = []
+            if batch:
+                conn.execute(insert, batch)
+
+        conn.execute(text(ORDERS_SQL), {
+            "status": "pending", "size": "small", "every": orders_every, "now": time.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+
+
+def timed_search(session_factory, query, repeat):
+    timings = []
+    for _ in range(repeat):
+        with session_factory() as db:
+            began = time.perf_counter()
+            rows, _ = search_orders(db, query, limit=20)
+            timings.append(time.perf_counter() - began)
+    return timings, len(rows)
+
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--orders-every", type=int, default=3, help="seed an order for every n-th user")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--queries", nargs="+", default=DEFAULT_QUERIES)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    run_migrations(engine)
+
+    if not args.skip_seed:
+        began = time.perf_counter()
+        seed(engine, args.users, args.orders_every)
+        print(f"seeded {args.users} users in {time.perf_counter() - began:.1f} s")
+
+    # the index is kept up to date during the load; this only refreshes
+    # planner statistics
+    ensure_search_indexes(engine)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"backend {search_backend(engine)}")
+
+    session_factory = sessionmaker(bind=engine)
+    for query in args.queries:
+        timings, found = timed_search(session_factory, query, args.repeat)
+        print(f"{query!r:18s} p50 {percentile(timings, 0.5) * 1000:8.1f} ms  "
+              f"p95 {percentile(timings, 0.95) * 1000:8.1f} ms  ({found} orders)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Measure worker cold start: import time of ``main`` and time to first request.
+
+Each measurement runs in a fresh interpreter. Without DATABASE_URL a
+throwaway SQLite file is used:
+
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+
+FIRST_REQUEST = """
+import time
+began = time.perf_counter()
+from fastapi.testclient import TestClient
+import main
+imported = time.perf_counter()
+with TestClient(main.create_app()) as client:
+    client.get("/")
+print(imported - began, time.perf_counter() - began)
+"""
+
+
+def import_profile(env, top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+
+    # entries are printed after their children, indented two spaces per level
+    children = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == "main":
+                total = int(cumulative)
+                break
+            children = []
+        elif depth == 1:
+            children.append((int(cumulative), name.strip()))
+
+    heaviest = sorted(children, reverse=True)[:top]
+    return total, heaviest
+
+
+def first_request(env):
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_REQUEST],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    imported, served = map(float, result.stdout.split()[-2:])
+    return imported, served
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="heaviest direct imports of main to list")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if "DATABASE_URL" not in env:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        env["DATABASE_URL"] = f"sqlite:///{path}"
+
+    total, heaviest = import_profile(env, args.top)
+    print(f"import main: {total / 1000:.1f} ms (python -X importtime)")
+    for cumulative, name in heaviest:
+        print(f"  {cumulative / 1000:8.1f} ms {name}")
+
+    imports, firsts = [], []
+    for _ in range(args.runs):
+        imported, served = first_request(env)
+        imports.append(imported)
+        firsts.append(served)
+
+    print(f"import (median of {args.runs}):            {statistics.median(imports) * 1000:8.1f} ms")
+    print(f"time to first request (median of {args.runs}): {statistics.median(firsts) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Measure how throughput scales with the number of gunicorn workers.
+
+Starts the production server (gunicorn.conf.py) once per worker count,
+drives it from several client processes and stops it with SIGTERM, the
+same way a container stop would:
+
+    python -m benchmarks.workers --max-workers 4 --duration 10
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+
+def wait_until_ready(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not come up")
+
+
+async def _drive(url, duration, concurrency):
+    done = 0
+    deadline = time.monotonic() + duration
+
+    async def worker(client):
+        nonlocal done
+        while time.monotonic() < deadline:
+            await client.get(url)
+            done += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits) as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    return done
+
+
+def drive(args):
+    return asyncio.run(_drive(*args))
+
+
+def run(workers, port, path, duration, clients, concurrency, env):
+    env = dict(env, WEB_CONCURRENCY=str(workers), BIND=f"127.0.0.1:{port}")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}{path}"
+        wait_until_ready(url)
+        with multiprocessing.Pool(clients) as pool:
+            total = sum(pool.map(drive, [(url, duration, concurrency)] * clients))
+        return total / duration
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=4, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="connections per client process")
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if "DATABASE_URL" not in env:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        env["DATABASE_URL"] = f"sqlite:///{path}"
+
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        rate = run(workers, args.port, args.path, args.duration, args.clients, args.concurrency, env)
+        baseline = baseline or rate
+        print(f"{workers:3d} workers: {rate:10.1f} req/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Time each order write and count the statements it sends to the orders table.
+
+Drives the app in-process with customer and staff writes against a fresh
+order. tests/test_order_writes.py asserts the statement counts; this
+reports them next to the timings. Without DATABASE_URL a throwaway SQLite
+file is used:
+
+    python -m benchmarks.writes --runs 200
+"""
+import argparse
+import logging
+import os
+import re
+import statistics
+import tempfile
+import time
+
+
+# \b keeps orders_archive and the partitions out
+ORDERS = re.compile(r"\borders\b", re.IGNORECASE)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+
+    if "DATABASE_URL" not in os.environ:
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+    from database import get_engine
+    import main as app_module
+
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with TestClient(app_module.create_app()) as client:
+        engine = get_engine()
+
+        def login(username, is_staff):
+            client.post("/user/signup", json={
+                "username": username, "email": f"{username}@example.com", "first_name": username,
+                "last_name": username, "password": "benchmark", "is_staff": is_staff, "is_active": True,
+            })
+            token = client.post("/auth/token", data={"username": username, "password": "benchmark"}).json()
+            return {"Authorization": f"Bearer {token['access_token']}"}
+
+        suffix = os.urandom(4).hex()
+        customer = login(f"writes-customer-{suffix}", False)
+        staff = login(f"writes-staff-{suffix}", True)
+        client.post("/catalog/items", headers=staff, json={
+            "name": f"writes-{suffix}", "prices": {"small": 1000, "medium": 1400, "large": 1800, "extra_large": 2200},
+        })
+
+        def place():
+            return client.post("/order/", headers=customer, json={"quantity": 1}).json()["order"]["id"]
+
+        writes = {
+            "PUT /order/{id}": lambda id, n: client.put(
+                f"/order/{id}", headers=customer,
+                json={"quantity": n % 5 + 1, "pizza_size": ("small", "large")[n % 2]},
+            ),
+            "PUT /staff/{id}": lambda id, n: client.put(
+                f"/staff/{id}", headers=staff,
+                params={"order_status": ("processing", "pending")[n % 2]},
+            ),
+            "DELETE /order/{id}": lambda id, n: client.delete(f"/order/{id}", headers=customer),
+            "DELETE /staff/{id}": lambda id, n: client.delete(f"/staff/{id}", headers=staff),
+        }
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *rest: statements.append(sql))
+
+        for name, write in writes.items():
+            deleting = name.startswith("DELETE")
+            order_id = place()
+            timings, counts = [], set()
+            for n in range(args.runs):
+                if deleting:
+                    order_id = place()
+                statements.clear()
+                began = time.perf_counter()
+                response = write(order_id, n)
+                timings.append(time.perf_counter() - began)
+                response.raise_for_status()
+                counts.add(sum(1 for sql in statements if ORDERS.search(sql)))
+
+            print(f"{name:20s} {max(counts)} statement(s) on orders, "
+                  f"median {statistics.median(timings) * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
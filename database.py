@@ -1,35 +1,39 @@
-import os
-from typing import Annotated
-from dotenv import load_dotenv
+from functools import lru_cache
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker, declarative_base
+from settings import get_settings
 
 
 
 
-load_dotenv()
+# Create a sessionmaker to create sessions for interacting with the database;
+# it is bound to the engine the first time get_engine() runs
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
 
-# Retrieve the PostgreSQL connection parameters
-POSTGRES_USER = os.getenv("POSTGRES_USER")
-POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
-POSTGRES_DB = os.getenv("POSTGRES_DB")
-POSTGRES_HOST = os.getenv("POSTGRES_HOST")
 
+# Create a base class for your SQLAlchemy models
+Base = declarative_base()
 
-# Construct the PostgreSQL connection string
-SQLALCHEMY_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}/{POSTGRES_DB}"
 
-# Create the SQLAlchemy engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+@lru_cache
+def get_engine() -> Engine:
+    # Create the SQLAlchemy engine on first use rather than at import
+    settings = get_settings()
+    url = settings.sqlalchemy_database_url
 
-# Create a sessionmaker to create sessions for interacting with the database
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    if url.startswith("sqlite"):
+        engine = create_engine(url, connect_args={"check_same_thread": False})
+    else:
+        pool_size, max_overflow = settings.db_pool_limits()
+        engine = create_engine(url, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True)
 
+    SessionLocal.configure(bind=engine)
+    return engine
 
-# Create a base class for your SQLAlchemy models
-Base = declarative_base()
 
 def get_db():
+    get_engine()
     db = SessionLocal()
     try:
         yield db
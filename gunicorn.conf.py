@@ -0,0 +1,47 @@
+"""Production serving: gunicorn managing uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py main:app
+
+Workers share nothing: each one builds its own engine and connection pool
+in the app's lifespan hook. The worker count defaults to the CPU count and
+can be set with WEB_CONCURRENCY; each worker's pool is sized from it so
+the total stays under POSTGRES_MAX_CONNECTIONS (see settings.py). The
+password hash cost is calibrated by the first worker and stored for the
+others (see services/hashing.py).
+
+On SIGTERM gunicorn stops accepting connections and gives in-flight
+requests GRACEFUL_TIMEOUT seconds to finish before workers are killed.
+"""
+import os
+from settings import get_settings
+
+
+settings = get_settings()
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = settings.workers
+worker_class = "uvicorn.workers.UvicornWorker"
+
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = 5
+
+# recycle workers now and then so slow leaks cannot build up
+max_requests = int(os.getenv("MAX_REQUESTS", "10000"))
+max_requests_jitter = max_requests // 10
+
+
+def on_starting(server):
+    # workers inherit this, so their pools are sized for the worker count
+    # actually in use even when --workers overrides this file
+    os.environ["WEB_CONCURRENCY"] = str(server.cfg.workers)
+    get_settings.cache_clear()
+
+    current = get_settings()
+
+    pool_size, max_overflow = current.db_pool_limits()
+    server.log.info(
+        f"starting {current.workers} workers, database pool {pool_size}+{max_overflow} per worker "
+        f"({current.workers * (pool_size + max_overflow)} of {current.postgres_max_connections} connections)"
+    )
+
@@ -1,28 +1,91 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, status
 from routers.auth import auth_router
-# from routers.order import order_router
 from routers.user import user_router
 from routers.order import order_router
 from routers.staff import staff_router
+from routers.catalog import catalog_router
+from services.catalog import CatalogReloader, reload_price_table
+from services.revocation import DenylistSync
+from services.outbox import OutboxRelay, make_sink
+from services.hashing import configure_hashing
+from services.query_budget import MODES, QueryBudgetMiddleware, install_query_budgets, query_budget
 from logger import logger
-from database import engine
-import models
+from database import SessionLocal, get_engine
+from migrations import run_migrations
+from settings import get_settings
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    engine = get_engine()
 
+    run_migrations(engine, months_ahead=settings.partition_months_ahead)
 
-app.include_router(auth_router)
-app.include_router(user_router)
-app.include_router(order_router)
-app.include_router(staff_router)
+    if settings.query_budgets != "off":
+        install_query_budgets(engine, SessionLocal)
 
-logger.info("starting app")
+    with SessionLocal() as db:
+        configure_hashing(
+            settings.password_scheme, settings.password_hash_target_ms,
+            cost=settings.password_hash_cost, argon2_memory_kib=settings.argon2_memory_kib, db=db,
+        )
+        reload_price_table(db)
 
-models.Base.metadata.create_all(bind=engine)
+    catalog_reloader = CatalogReloader(SessionLocal, settings.catalog_reload_seconds)
+    catalog_reloader.start()
 
+    denylist_sync = DenylistSync(SessionLocal, settings.revocation_sync_seconds)
+    denylist_sync.start()
 
-@app.get("/", status_code=status.HTTP_200_OK)
-async def home():
-    return {"message": "Welcome to our home page!"}
-                                                   
\ No newline at end of file
+    outbox_relay = None
+    if settings.outbox_sink:
+        outbox_relay = OutboxRelay(
+            SessionLocal, make_sink(settings.outbox_sink),
+            batch_size=settings.outbox_batch_size, interval=settings.outbox_poll_seconds,
+        )
+        outbox_relay.start()
+
+    logger.info("app started")
+    yield
+
+    if outbox_relay:
+        outbox_relay.stop()
+    denylist_sync.stop()
+    catalog_reloader.stop()
+    engine.dispose()
+
+
+def create_app() -> FastAPI:
+    app = FastAPI(lifespan=lifespan)
+
+    settings = get_settings()
+    if settings.query_budgets not in MODES:
+        raise ValueError(f"QUERY_BUDGETS must be one of {', '.join(MODES)}, not {settings.query_budgets!r}")
+    if settings.query_budgets != "off":
+        app.add_middleware(QueryBudgetMiddleware, strict=settings.query_budgets == "strict")
+
+    if settings.profiling:
+        # imported here so that a worker without profiling never loads it;
+        # added last so the staff check it runs is not counted in budgets
+        from routers.admin import admin_router
+        from services.profiling import RequestProfilerMiddleware
+        app.include_router(admin_router)
+        app.add_middleware(RequestProfilerMiddleware)
+
+    app.include_router(auth_router)
+    app.include_router(user_router)
+    app.include_router(order_router)
+    app.include_router(staff_router)
+    app.include_router(catalog_router)
+
+    @app.get("/", status_code=status.HTTP_200_OK)
+    @query_budget(queries=0, rows=0)
+    async def home():
+        return {"message": "Welcome to our home page!"}
+
+    return app
+
+
+app = create_app()
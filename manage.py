@@ -0,0 +1,138 @@
+"""Operational commands.
+
+Usage:
+
+    python manage.py rebuild-rollups [--check]
+    python manage.py archive-orders [--older-than-days 90] [--loop]
+    python manage.py create-partitions [--since 2024-01-01] [--months-ahead 3]
+    python manage.py relay-events [--sink file:events.jsonl] [--once]
+    python manage.py calibrate-hashing
+"""
+import argparse
+import sys
+from datetime import date, timedelta
+from database import SessionLocal, get_engine
+from migrations import ensure_order_partitions
+from logger import logger
+from services.archive import ArchiveJob, parse_peak_hours
+from services.hashing import calibrated_cost
+from services.outbox import OutboxRelay, make_sink, outbox_backlog
+from services.rollups import rebuild_rollups
+from settings import get_settings
+
+
+def rebuild_rollups_command(args):
+    with SessionLocal() as db:
+        mismatches = rebuild_rollups(db, check_only=args.check)
+
+    for mismatch in mismatches:
+        logger.warning(f"rollup mismatch: {mismatch}")
+
+    if args.check:
+        logger.info(f"rollups checked: {len(mismatches)} mismatches")
+        return 1 if mismatches else 0
+
+    logger.info(f"rollups rebuilt: {len(mismatches)} rows corrected")
+    return 0
+
+
+def archive_orders_command(args):
+    job = ArchiveJob(
+        SessionLocal,
+        older_than=timedelta(days=args.older_than_days),
+        batch_size=args.batch_size,
+        pause=args.pause,
+        idle_interval=args.idle_interval,
+        peak_hours=parse_peak_hours(args.peak_hours),
+    )
+
+    if args.loop:
+        job.run_forever()
+        return 0
+
+    if job.in_peak():
+        logger.info("inside peak hours, nothing archived")
+        return 0
+
+    logger.info(f"archived {job.run_once()} orders")
+    return 0
+
+
+def create_partitions_command(args):
+    created = ensure_order_partitions(get_engine(), since=args.since, months_ahead=args.months_ahead)
+    logger.info(f"{created} partitions created")
+    return 0
+
+
+def relay_events_command(args):
+    settings = get_settings()
+    sink = args.sink or settings.outbox_sink
+    if not sink:
+        logger.error("no sink given; pass --sink or set OUTBOX_SINK")
+        return 2
+
+    relay = OutboxRelay(
+        SessionLocal, make_sink(sink),
+        batch_size=args.batch_size or settings.outbox_batch_size,
+        interval=args.interval or settings.outbox_poll_seconds,
+    )
+
+    if args.once:
+        delivered = relay.drain()
+        with SessionLocal() as db:
+            backlog = outbox_backlog(db)
+        logger.info(f"delivered {delivered} order events, {backlog['pending']} pending")
+        return 0
+
+    relay.run_forever()
+    return 0
+
+
+def calibrate_hashing_command(args):
+    settings = get_settings()
+    with SessionLocal() as db:
+        calibrated_cost(db, settings.password_scheme, settings.password_hash_target_ms,
+                        settings.argon2_memory_kib, recalibrate=True)
+    logger.info("stored; processes started from now on use the new cost")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pizza Delivery API management commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-rollups", help="recompute revenue rollups from the orders table")
+    rebuild.add_argument("--check", action="store_true", help="only report mismatches, do not rewrite")
+    rebuild.set_defaults(handler=rebuild_rollups_command)
+
+    archive = commands.add_parser("archive-orders", help="move old delivered, cancelled and deleted orders to the archive")
+    archive.add_argument("--older-than-days", type=int, default=90)
+    archive.add_argument("--batch-size", type=int, default=500)
+    archive.add_argument("--pause", type=float, default=1.0, help="seconds to sleep between batches")
+    archive.add_argument("--idle-interval", type=float, default=300.0, help="seconds between runs with --loop")
+    archive.add_argument("--peak-hours", default="11-14,17-22", help="local hour ranges to stay idle, e.g. 11-14,17-22")
+    archive.add_argument("--loop", action="store_true", help="keep running in the background")
+    archive.set_defaults(handler=archive_orders_command)
+
+    partitions = commands.add_parser("create-partitions", help="create monthly orders partitions ahead of time")
+    partitions.add_argument("--since", type=date.fromisoformat, default=None, help="first month to cover, e.g. 2024-01-01")
+    partitions.add_argument("--months-ahead", type=int, default=3)
+    partitions.set_defaults(handler=create_partitions_command)
+
+    relay = commands.add_parser("relay-events", help="deliver order events from the outbox to a sink")
+    relay.add_argument("--sink", default=None, help="file:PATH or an http(s) URL; defaults to OUTBOX_SINK")
+    relay.add_argument("--batch-size", type=int, default=None)
+    relay.add_argument("--interval", type=float, default=None, help="seconds between polls when the outbox is empty")
+    relay.add_argument("--once", action="store_true", help="deliver what is pending and exit")
+    relay.set_defaults(handler=relay_events_command)
+
+    calibrate = commands.add_parser("calibrate-hashing", help="measure the password hash cost again and store it")
+    calibrate.set_defaults(handler=calibrate_hashing_command)
+
+    args = parser.parse_args(argv)
+    get_engine()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+"""Schema setup that ``create_all`` cannot do on its own.
+
+On Postgres ``orders`` is range-partitioned by ``created_at`` with one
+partition per month. Partitions are created ahead of time, at startup and
+by ``python manage.py create-partitions``, so inserts normally never land
+in the default partition. Rows that did are moved into their month's
+partition when it is created. Other databases use a plain table and skip
+this.
+
+Columns added to existing tables since they were first created are added
+here too, as is the customer search index (see services/search.py).
+"""
+from datetime import date
+from typing import Iterator, Optional
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+import models
+from services import search
+from logger import logger
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def months_between(start: date, end: date) -> Iterator[date]:
+    month = month_start(start)
+    while month <= end:
+        yield month
+        month = add_months(month, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def is_partitioned(engine: Engine, table: str) -> bool:
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+            {"table": table},
+        ).first() is not None
+
+
+def ensure_order_partitions(engine: Engine, since: Optional[date] = None, months_ahead: int = 3) -> int:
+    """Create monthly partitions of ``orders`` from ``since`` up to ``months_ahead`` months from now.
+
+    Returns the number of partitions that were missing.
+    """
+    if engine.dialect.name != "postgresql":
+        return 0
+
+    table = models.Order.__tablename__
+    if not is_partitioned(engine, table):
+        logger.warning(f"{table} is not partitioned; it has to be migrated by hand before partitions can be managed")
+        return 0
+
+    today = date.today()
+    default = f"{table}_default"
+    created = 0
+    with engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {default} PARTITION OF {table} DEFAULT"))
+
+        for month in months_between(since or today, add_months(today, months_ahead)):
+            name = partition_name(table, month)
+            if conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+                continue
+
+            start, end = month.isoformat(), add_months(month, 1).isoformat()
+            in_month = f"created_at >= '{start}' AND created_at < '{end}'"
+            create = f"CREATE TABLE {name} PARTITION OF {table} FOR VALUES FROM ('{start}') TO ('{end}')"
+
+            if conn.execute(text(f"SELECT 1 FROM {default} WHERE {in_month} LIMIT 1")).first() is None:
+                conn.execute(text(create))
+            else:
+                # the month ran past the partitions created ahead and its rows
+                # went to the default partition, which then refuses a partition
+                # overlapping them; move them over while the default is detached
+                conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+                conn.execute(text(create))
+                moved = conn.execute(text(f"INSERT INTO {table} SELECT * FROM {default} WHERE {in_month}")).rowcount
+                conn.execute(text(f"DELETE FROM {default} WHERE {in_month}"))
+                conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+                logger.warning(f"moved {moved} rows from {default} into {name}")
+            created += 1
+
+    if created:
+        logger.info(f"created {created} {table} partitions")
+    return created
+
+
+def ensure_search_indexes(engine: Engine) -> str:
+    """Create the customer search index for this database. Returns the search backend in use."""
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'users_fts'")).first()
+            if not exists:
+                fields = ", ".join(search.SEARCH_FIELDS)
+                new_values = ", ".join(f"new.{field}" for field in search.SEARCH_FIELDS)
+                old_values = ", ".join(f"old.{field}" for field in search.SEARCH_FIELDS)
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE users_fts USING fts5({fields}, "
+                    f"content='users', content_rowid='id', tokenize='trigram')"
+                ))
+                conn.execute(text(
+                    f"CREATE TRIGGER users_fts_insert AFTER INSERT ON users BEGIN "
+                    f"INSERT INTO users_fts(rowid, {fields}) VALUES (new.id, {new_values}); END"
+                ))
+                conn.execute(text(
+                    f"CREATE TRIGGER users_fts_delete AFTER DELETE ON users BEGIN "
+                    f"INSERT INTO users_fts(users_fts, rowid, {fields}) VALUES ('delete', old.id, {old_values}); END"
+                ))
+                conn.execute(text(
+                    f"CREATE TRIGGER users_fts_update AFTER UPDATE ON users BEGIN "
+                    f"INSERT INTO users_fts(users_fts, rowid, {fields}) VALUES ('delete', old.id, {old_values}); "
+                    f"INSERT INTO users_fts(rowid, {fields}) VALUES (new.id, {new_values}); END"
+                ))
+                conn.execute(text("INSERT INTO users_fts(users_fts) VALUES ('rebuild')"))
+        return search.search_backend(engine)
+
+    if engine.dialect.name != "postgresql":
+        return ""
+
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError as e:
+        logger.warning(f"pg_trgm is not available, customer search falls back to full-text search: {e.orig}")
+
+    backend = search.search_backend(engine)
+    with engine.begin() as conn:
+        if backend == "trigram":
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_users_search_trgm ON users "
+                f"USING gin (({search.index_expression(search.search_document())}) gin_trgm_ops)"
+            ))
+        else:
+            # stored, so ranking a broad match does not parse every row again
+            conn.execute(text(
+                f"ALTER TABLE users ADD COLUMN IF NOT EXISTS {search.SEARCH_VECTOR_COLUMN} tsvector "
+                f"GENERATED ALWAYS AS ({search.index_expression(search.search_vector())}) STORED"
+            ))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_users_search_fulltext ON users "
+                f"USING gin ({search.SEARCH_VECTOR_COLUMN})"
+            ))
+        # orders created before user_id was indexed
+        conn.execute(text("CREATE INDEX IF NOT EXISTS ix_orders_user_id ON orders (user_id)"))
+    return backend
+
+
+def column_definition(column, engine: Engine) -> str:
+    definition = f"{column.name} {column.type.compile(dialect=engine.dialect)}"
+    if column.server_default is not None:
+        definition += f" DEFAULT {column.server_default.arg}"
+        if not column.nullable:
+            definition += " NOT NULL"
+    for foreign_key in column.foreign_keys:
+        definition += f" REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name})"
+    return definition
+
+
+def ensure_columns(engine: Engine) -> list:
+    """Add the columns the models gained after their tables were created.
+
+    ``create_all`` only creates missing tables, so a database created by an
+    older release would otherwise lack them. Returns the added columns as
+    ``table.column``.
+    """
+    inspector = inspect(engine)
+    now = "timezone('utc', now())" if engine.dialect.name == "postgresql" else "CURRENT_TIMESTAMP"
+    added = []
+    for table in models.Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        missing = [column for column in table.columns if column.name not in existing]
+        if not missing:
+            continue
+
+        with engine.begin() as conn:
+            for column in missing:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column_definition(column, engine)}"))
+                if not column.nullable and column.server_default is None:
+                    # only orders.created_at so far: rows placed before it
+                    # existed are dated to the upgrade
+                    conn.execute(text(f"UPDATE {table.name} SET {column.name} = {now} WHERE {column.name} IS NULL"))
+                    if engine.dialect.name == "postgresql":
+                        conn.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN {column.name} SET NOT NULL"))
+                added.append(f"{table.name}.{column.name}")
+            for index in table.indexes:
+                if any(column.name not in existing for column in index.columns):
+                    index.create(conn, checkfirst=True)
+
+    if added:
+        logger.info(f"added columns {', '.join(added)}")
+    return added
+
+
+# arbitrary key for pg_advisory_lock, shared by every process running migrations
+MIGRATION_LOCK_KEY = 7_341_200
+
+
+def run_migrations(engine: Engine, months_ahead: int = 3):
+    if engine.dialect.name != "postgresql":
+        models.Base.metadata.create_all(bind=engine)
+        ensure_columns(engine)
+        ensure_search_indexes(engine)
+        return
+
+    # every worker runs this at startup; the lock makes them take turns so
+    # they do not race to create the same tables, types and partitions
+    with engine.connect() as lock:
+        lock.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            models.Base.metadata.create_all(bind=engine)
+            ensure_columns(engine)
+            ensure_order_partitions(engine, months_ahead=months_ahead)
+            ensure_search_indexes(engine)
+        finally:
+            lock.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+            lock.commit()
@@ -1,6 +1,9 @@
-from sqlalchemy import Column, String, Integer, Boolean, Text, Enum, ForeignKey
+from datetime import datetime
+from sqlalchemy import Column, String, Integer, Boolean, Text, Enum, ForeignKey, Float, DateTime, Date, UniqueConstraint, func
 from schema.order import OrderStatus, PizzaSizes
 from sqlalchemy.orm import relationship
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.schema import PrimaryKeyConstraint
 from database import Base
 
 
@@ -16,6 +19,9 @@ class User(Base):
     password = Column(String(100), nullable=False)
     is_staff = Column(Boolean, default=False)
     is_active = Column(Boolean, default=False)
+    address = Column(String(255), nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
 
     orders = relationship("Order", back_populates="user")
 
@@ -28,19 +34,29 @@ class User(Base):
             "last_name": self.last_name,
             "is_staff": self.is_staff,
             "is_active": self.is_active,
+            "address": self.address,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
         }
     
 
-class Order(Base):
-    __tablename__ = "orders"
+class OrderMixin:
+    """Columns shared by the hot ``orders`` table and ``orders_archive``."""
 
-    id = Column(Integer, primary_key=True, index=True)
     quantity = Column(Integer, nullable=False)
     order_status = Column(Enum(OrderStatus), default=OrderStatus.pending)
     pizza_size = Column(Enum(PizzaSizes), default=PizzaSizes.small)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-
-    user = relationship('User', back_populates='orders')
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    delivery_address = Column(String(255), nullable=True)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=True)
+    toppings = Column(Text, nullable=True)
+    unit_price = Column(Integer, nullable=True)
+    total_price = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    deleted_at = Column(DateTime, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
 
     def serialize(self):
         return {
@@ -49,19 +65,166 @@ class Order(Base):
             "order_status": self.order_status,
             "pizza_size": self.pizza_size,
             "user_id": self.user_id,
+            "delivery_address": self.delivery_address,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "item_id": self.item_id,
+            "toppings": self.toppings.split(",") if self.toppings else [],
+            "unit_price": self.unit_price,
+            "total_price": self.total_price,
+            "created_at": self.created_at,
+            "version": self.version,
         }
 
 
+class Order(OrderMixin, Base):
+    __tablename__ = "orders"
+    # Postgres keeps one partition per month (see migrations.py); other
+    # databases get a plain table
+    # SQLite must not hand out the id of an archived order again, as it
+    # would collide in orders_archive
+    __table_args__ = {
+        "postgresql_partition_by": "RANGE (created_at)",
+        "sqlite_autoincrement": True,
+        "info": {"partition_key": "created_at"},
+    }
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    user = relationship('User', back_populates='orders')
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _partitioned_primary_key(constraint, compiler, **kw):
+    # a partitioned table's primary key has to include the partition key
+    key = constraint.table.info.get("partition_key")
+    if key is None or key in constraint.columns:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+
+    columns = [column.name for column in constraint.columns] + [key]
+    return "PRIMARY KEY (%s)" % ", ".join(compiler.preparer.quote(name) for name in columns)
+
 
+class OrderArchive(OrderMixin, Base):
+    __tablename__ = "orders_archive"
 
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def serialize(self):
+        return {**super().serialize(), "archived_at": self.archived_at}
+
+
+class MenuItem(Base):
+    __tablename__ = "menu_items"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, nullable=False)
+    description = Column(Text, nullable=True)
+    is_active = Column(Boolean, default=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    prices = relationship("MenuPrice", back_populates="item", cascade="all, delete-orphan")
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "is_active": self.is_active,
+            "prices": {price.pizza_size.value: price.price for price in self.prices},
+        }
+
+
+class MenuPrice(Base):
+    __tablename__ = "menu_prices"
+    __table_args__ = (UniqueConstraint("item_id", "pizza_size"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    item_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)
+    pizza_size = Column(Enum(PizzaSizes), nullable=False)
+    price = Column(Integer, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    item = relationship("MenuItem", back_populates="prices")
+
+
+class Topping(Base):
+    __tablename__ = "toppings"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(50), unique=True, nullable=False)
+    price = Column(Integer, nullable=False)
+    is_active = Column(Boolean, default=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    def serialize(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "price": self.price,
+            "is_active": self.is_active,
+        }
+
+
+class RevenueRollup(Base):
+    __tablename__ = "revenue_rollups"
+
+    day = Column(Date, primary_key=True)
+    pizza_size = Column(Enum(PizzaSizes), primary_key=True)
+    order_status = Column(Enum(OrderStatus), primary_key=True)
+    order_count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Integer, nullable=False, default=0)
+
+    def serialize(self):
+        return {
+            "day": self.day,
+            "pizza_size": self.pizza_size,
+            "order_status": self.order_status,
+            "order_count": self.order_count,
+            "quantity": self.quantity,
+            "revenue": self.revenue,
+        }
 
 
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
 
+    jti = Column(String(32), primary_key=True)
+    token_type = Column(String(16), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"))
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
 
+class OrderEvent(Base):
+    """Outbox row written in the same transaction as the order change it describes."""
 
+    __tablename__ = "order_events"
+    # consumers deduplicate on id, so SQLite must not reuse the ids of
+    # delivered (deleted) rows
+    __table_args__ = {"sqlite_autoincrement": True}
 
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String(32), nullable=False)
+    # no foreign key: events outlive the order rows, which are archived or
+    # live in a partitioned table
+    order_id = Column(Integer, nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # set while a relay is delivering the row; an expired claim is retried
+    claimed_until = Column(DateTime, nullable=True)
 
 
+class PasswordHashCost(Base):
+    """Hash cost calibrated for a scheme and target, shared by every process (see services/hashing.py)."""
 
+    __tablename__ = "password_hash_costs"
 
+    scheme = Column(String(16), primary_key=True)
+    target_ms = Column(Float, primary_key=True)
+    argon2_memory_kib = Column(Integer, primary_key=True)
+    cost = Column(Integer, nullable=False)
+    verify_ms = Column(Float, nullable=False)
+    calibrated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
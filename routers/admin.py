@@ -0,0 +1,117 @@
+import asyncio
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+from services.auth import get_current_user
+from services.profiling import request_profile, request_profiles, sample_stacks
+from services.query_budget import query_budget
+import models
+from database import get_db
+from logger import logger
+
+
+db_dependency = Annotated[Session, Depends(get_db)]
+
+
+admin_router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+def _require_staff(user: models.User):
+    if not user.is_staff:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User is not authorized to perform this action",
+        )
+
+
+@admin_router.get('/profile', response_class=PlainTextResponse, status_code=status.HTTP_200_OK)
+@query_budget(queries=1, rows=1)
+async def profile_worker(db: db_dependency, seconds: float = Query(10.0, gt=0, le=60),
+                         interval_ms: float = Query(5.0, ge=1, le=1000),
+                         user: models.User = Depends(get_current_user)):
+
+    """
+    ## Samples the stacks of every thread in this worker and returns them as collapsed stacks.
+
+    Each line is a semicolon separated stack, root first, followed by the number of
+    samples it was seen in; feed it to flamegraph.pl or speedscope. Only the worker
+    that serves the request is profiled.
+
+    Parameters:
+    - seconds (float): How long to sample, at most 60.
+    - interval_ms (float): Time between samples.
+
+    Returns:
+    - str: The collapsed stacks, most frequent first.
+
+    Raises:
+    - HTTPException: If the user is not a staff member or another profile of this worker is running.
+    """
+    _require_staff(user)
+    # do not keep a pooled connection checked out while sampling
+    db.close()
+
+    stacks = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000)
+    if stacks is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="This worker is already being profiled",
+        )
+
+    logger.info(f"{user.username} profiled the worker for {seconds:.0f} s")
+    return stacks
+
+
+@admin_router.get('/profile/requests', status_code=status.HTTP_200_OK)
+@query_budget(queries=1, rows=1)
+async def list_request_profiles(user: models.User = Depends(get_current_user)):
+
+    """
+    ## Lists the most recent request profiles kept by this worker.
+
+    Send any request with the header `X-Profile: 1` (or a pstats sort key: cumulative,
+    tottime, calls) as a staff member to profile it; its response carries `X-Profile-Id`.
+
+    Returns:
+    - dict: Id, method, path, duration and capture time of each profile, oldest first.
+
+    Raises:
+    - HTTPException: If the user is not a staff member.
+    """
+    _require_staff(user)
+    return {
+        "status": "success",
+        "profiles": request_profiles(),
+    }
+
+
+@admin_router.get('/profile/requests/{id}', response_class=PlainTextResponse, status_code=status.HTTP_200_OK)
+@query_budget(queries=1, rows=1)
+async def get_request_profile(id: str, user: models.User = Depends(get_current_user)):
+
+    """
+    ## Returns the cProfile output of a profiled request.
+
+    Parameters:
+    - id (str): The `X-Profile-Id` returned with the profiled response.
+
+    Returns:
+    - str: pstats output for the request.
+
+    Raises:
+    - HTTPException: If the user is not a staff member or the profile is not kept by this worker.
+    """
+    _require_staff(user)
+
+    capture = request_profile(id)
+    if capture is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found",
+        )
+    return capture["stats"]
@@ -3,7 +3,11 @@ from typing import Annotated
 from sqlalchemy.orm import Session
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from services.auth import token_generator, authenticate_user, get_db
+from services.auth import token_generator, authenticate_user, get_db, decode_token, get_token_payload, issue_tokens
+from services.revocation import revoke_token
+from services.query_budget import query_budget
+from schema.user import RefreshTokenModel, RevokeTokenModel
+import models
 
 
 db_dependency = Annotated[Session, Depends(get_db)]
@@ -17,11 +21,84 @@ auth_router = APIRouter(
 
 
 @auth_router.post('/token', status_code=status.HTTP_201_CREATED)
+@query_budget(queries=2, rows=1)
 async def generate_token(db: db_dependency, request_form: OAuth2PasswordRequestForm = Depends()):
-    token = await token_generator(db, request_form.username, request_form.password)
+    tokens = await token_generator(db, request_form.username, request_form.password)
     return {
-        'access_token': token,
+        **tokens,
         'token_type': 'bearer',
     }
 
 
+@auth_router.post('/refresh', status_code=status.HTTP_201_CREATED)
+@query_budget(queries=3, rows=2)
+async def refresh_token(db: db_dependency, body: RefreshTokenModel):
+
+    """
+    ## Exchanges a refresh token for a new access and refresh token.
+
+    Refresh tokens are single use: the one presented is revoked, so a stolen
+    token that has already been used is rejected.
+
+    Parameters:
+    - body (RefreshTokenModel): The refresh token returned by /auth/token or a previous refresh.
+
+    Returns:
+    - dict: A new access token, refresh token and the access token lifetime in seconds.
+
+    Raises:
+    - HTTPException: If the refresh token is invalid, expired or already used.
+    """
+    payload = decode_token(body.refresh_token, "refresh")
+
+    user = db.query(models.User).filter(models.User.id == payload.get("id")).first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    # the primary key on jti makes concurrent refreshes with one token race
+    # for a single winner
+    if not revoke_token(db, payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    return {
+        **issue_tokens(user),
+        'token_type': 'bearer',
+    }
+
+
+@auth_router.post('/revoke', status_code=status.HTTP_204_NO_CONTENT)
+@query_budget(queries=2, rows=0)
+async def revoke(db: db_dependency, body: RevokeTokenModel, payload: dict = Depends(get_token_payload)):
+
+    """
+    ## Logs out: revokes the access token used for this request and, if given, a refresh token.
+
+    Parameters:
+    - body (RevokeTokenModel): Optionally the refresh token issued alongside the access token.
+
+    Returns:
+    - None
+
+    Raises:
+    - HTTPException: If the access token is invalid or the refresh token belongs to another user.
+    """
+    if body.refresh_token:
+        refresh = decode_token(body.refresh_token, "refresh")
+        if refresh.get("id") != payload.get("id"):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid token",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        revoke_token(db, refresh)
+
+    revoke_token(db, payload)
+    return None
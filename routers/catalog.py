@@ -0,0 +1,208 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from services.auth import get_current_user
+from services.catalog import apply_item, apply_topping, get_price_table
+from services.query_budget import query_budget
+from schema.catalog import MenuItemModel, ToppingModel
+import models
+from database import get_db
+from logger import logger
+
+
+db_dependency = Annotated[Session, Depends(get_db)]
+
+
+catalog_router = APIRouter(
+    prefix="/catalog",
+    tags=["catalog"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+def _require_staff(user: models.User):
+    if not user.is_staff:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User is not authorized to perform this action",
+        )
+
+
+def _set_prices(item: models.MenuItem, prices: dict):
+    existing = {price.pizza_size: price for price in item.prices}
+    for size, amount in prices.items():
+        if size in existing:
+            existing[size].price = amount
+        else:
+            item.prices.append(models.MenuPrice(pizza_size=size, price=amount))
+    for size, price in existing.items():
+        if size not in prices:
+            item.prices.remove(price)
+
+
+@catalog_router.get("/", status_code=status.HTTP_200_OK)
+@query_budget(queries=0, rows=0)
+async def get_menu():
+
+    """
+    ## Returns the active menu items, their prices per size and the available toppings.
+
+    Served from the in-memory price table; prices are in minor currency units.
+    """
+    return {
+        "status": "success",
+        "menu": get_price_table().serialize(),
+    }
+
+
+@catalog_router.post("/items", status_code=status.HTTP_201_CREATED)
+@query_budget(queries=8, rows=6)
+async def create_menu_item(db: db_dependency, item: MenuItemModel, user: models.User = Depends(get_current_user)):
+
+    try:
+        _require_staff(user)
+
+        new_item = models.MenuItem(
+            name=item.name,
+            description=item.description,
+            is_active=item.is_active,
+        )
+        _set_prices(new_item, item.prices)
+
+        db.add(new_item)
+        db.commit()
+
+        apply_item(new_item)
+
+        return {
+            "message": "Menu item created successfully",
+            "item": new_item.serialize()
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+@catalog_router.put("/items/{id}", status_code=status.HTTP_200_OK)
+@query_budget(queries=10, rows=11)
+async def update_menu_item(db: db_dependency, id: int, item: MenuItemModel,
+                           user: models.User = Depends(get_current_user)):
+
+    try:
+        _require_staff(user)
+
+        db_item = db.query(models.MenuItem).filter(models.MenuItem.id == id).first()
+        if not db_item:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Menu item not found",
+            )
+
+        db_item.name = item.name
+        db_item.description = item.description
+        db_item.is_active = item.is_active
+        _set_prices(db_item, item.prices)
+
+        db.commit()
+
+        apply_item(db_item)
+
+        return {
+            "status": "success",
+            "item": db_item.serialize()
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+@catalog_router.post("/toppings", status_code=status.HTTP_201_CREATED)
+@query_budget(queries=3, rows=2)
+async def create_topping(db: db_dependency, topping: ToppingModel, user: models.User = Depends(get_current_user)):
+
+    try:
+        _require_staff(user)
+
+        if "," in topping.name:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Topping names cannot contain commas",
+            )
+
+        new_topping = models.Topping(**topping.model_dump())
+
+        db.add(new_topping)
+        db.commit()
+
+        apply_topping(new_topping)
+
+        return {
+            "message": "Topping created successfully",
+            "topping": new_topping.serialize()
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+@catalog_router.put("/toppings/{id}", status_code=status.HTTP_200_OK)
+@query_budget(queries=4, rows=3)
+async def update_topping(db: db_dependency, id: int, topping: ToppingModel,
+                         user: models.User = Depends(get_current_user)):
+
+    try:
+        _require_staff(user)
+
+        if "," in topping.name:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Topping names cannot contain commas",
+            )
+
+        db_topping = db.query(models.Topping).filter(models.Topping.id == id).first()
+        if not db_topping:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Topping not found",
+            )
+
+        previous_name = db_topping.name
+        db_topping.name = topping.name
+        db_topping.price = topping.price
+        db_topping.is_active = topping.is_active
+
+        db.commit()
+
+        apply_topping(db_topping, previous_name)
+
+        return {
+            "status": "success",
+            "topping": db_topping.serialize()
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
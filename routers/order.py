@@ -1,14 +1,21 @@
-from typing import Annotated
+from typing import Annotated, Optional
+from sqlalchemy import true
 from sqlalchemy.orm import Session
 from fastapi import APIRouter, HTTPException, status
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from services.auth import get_hash_password, get_current_user, verify_password, token_generator
+from services.catalog import get_price_table
+from services.rollups import OrderFacts, record_created, record_changed, record_deleted
+from services.outbox import ORDER_CREATED, ORDER_DELETED, ORDER_UPDATED, record_event
+from services.archive import archived_orders, page_with_archived
+from services.orders import MAX_PAGE_SIZE, etag, page, parse_if_match, update_returning_previous, version_conflict, write_failed
+from services.query_budget import query_budget
+from datetime import datetime
 from schema.user import LoginModel, SignUpModel
 from schema.order import OrderModel
 import models
 from database import get_db
 from logger import logger
-from database import engine
 
 
 db_dependency = Annotated[Session, Depends(get_db)]
@@ -20,10 +27,9 @@ order_router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-models.Base.metadata.create_all(bind=engine)
-
 
 @order_router.post("/", status_code=status.HTTP_201_CREATED)
+@query_budget(queries=5, rows=2)
 async def place_an_order(db: db_dependency, order: OrderModel, user: LoginModel = Depends(get_current_user)):
 
     try:
@@ -33,14 +39,39 @@ async def place_an_order(db: db_dependency, order: OrderModel, user: LoginModel
                 detail="User not authenticated",
             )
         
+        item_id, unit_price, total_price = get_price_table().quote(
+            order.item_id, order.pizza_size, order.toppings, order.quantity
+        )
+
         new_order = models.Order(
             pizza_size = order.pizza_size,
             quantity = order.quantity,
+            item_id = item_id,
+            toppings = ",".join(order.toppings) or None,
+            unit_price = unit_price,
+            total_price = total_price,
         )
 
+        # fall back to the customer's saved address when the order has none;
+        # an address without coordinates is left for staff to place
+        if order.latitude is not None and order.longitude is not None:
+            new_order.delivery_address = order.delivery_address
+            new_order.latitude = order.latitude
+            new_order.longitude = order.longitude
+        elif order.delivery_address:
+            new_order.delivery_address = order.delivery_address
+        else:
+            new_order.delivery_address = user.address
+            new_order.latitude = user.latitude
+            new_order.longitude = user.longitude
+
         new_order.user = user
 
         db.add(new_order)
+        db.flush()
+
+        record_created(db, new_order)
+        record_event(db, ORDER_CREATED, new_order)
 
         db.commit()
 
@@ -58,7 +89,10 @@ async def place_an_order(db: db_dependency, order: OrderModel, user: LoginModel
 
 
 @order_router.get("/", status_code=status.HTTP_200_OK)
-async def get_user_orders(db: db_dependency, user: LoginModel = Depends(get_current_user)):
+@query_budget(queries=2, rows=102)
+async def get_user_orders(db: db_dependency, include_archived: bool = False,
+                          limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), offset: int = Query(0, ge=0),
+                          user: LoginModel = Depends(get_current_user)):
     try:
         if not user:
             raise HTTPException(
@@ -66,12 +100,20 @@ async def get_user_orders(db: db_dependency, user: LoginModel = Depends(get_curr
                 detail="User not authenticated",
             )
 
-        orders = db.query(models.Order).filter(models.Order.user_id == user.id).all()
+        if include_archived:
+            orders, has_more = page_with_archived(
+                db, [models.Order.user_id == user.id], [models.OrderArchive.user_id == user.id], limit, offset
+            )
+        else:
+            orders, has_more = page(db.query(models.Order).filter(
+                models.Order.user_id == user.id, models.Order.deleted_at.is_(None)
+            ).order_by(models.Order.id), limit, offset)
 
         if orders:
             return {
                 "status": "success",
-                "orders": [order.serialize() for order in orders]
+                "orders": [order.serialize() for order in orders],
+                "next_offset": offset + limit if has_more else None,
             }
         else:
             return {
@@ -88,7 +130,9 @@ async def get_user_orders(db: db_dependency, user: LoginModel = Depends(get_curr
     
 
 @order_router.get("/{id}/", status_code=status.HTTP_200_OK)
-async def get_user_specific_order(db: db_dependency, id: int, user: LoginModel = Depends(get_current_user)):
+@query_budget(queries=3, rows=2)
+async def get_user_specific_order(db: db_dependency, id: int, response: Response, include_archived: bool = False,
+                                  user: LoginModel = Depends(get_current_user)):
     try:
         if not user:
             raise HTTPException(
@@ -96,9 +140,17 @@ async def get_user_specific_order(db: db_dependency, id: int, user: LoginModel =
                 detail="User not authenticated",
             )
 
-        order = db.query(models.Order).filter(models.Order.id == id, models.Order.user_id == user.id).first()
+        order = db.query(models.Order).filter(
+            models.Order.id == id, models.Order.user_id == user.id, models.Order.deleted_at.is_(None)
+        ).first()
+
+        if order is None and include_archived:
+            order = archived_orders(
+                db, models.OrderArchive.id == id, models.OrderArchive.user_id == user.id
+            ).first()
 
         if order:
+            response.headers["ETag"] = etag(order.version)
             return {
                 "status": "success",
                 "order": order.serialize()
@@ -120,7 +172,9 @@ async def get_user_specific_order(db: db_dependency, id: int, user: LoginModel =
 
 
 @order_router.put("/{id}", status_code=status.HTTP_200_OK)
-async def update_order(db: db_dependency, id: int, order_data: OrderModel, user: LoginModel = Depends(get_current_user)):
+@query_budget(queries=6, rows=3)
+async def update_order(db: db_dependency, id: int, order_data: OrderModel, response: Response,
+                       if_match: Optional[str] = Header(None), user: LoginModel = Depends(get_current_user)):
     try:
         if not user:
             raise HTTPException(
@@ -128,24 +182,66 @@ async def update_order(db: db_dependency, id: int, order_data: OrderModel, user:
                 detail="User not authenticated",
             )
 
-        db_order = db.query(models.Order).filter(models.Order.id == id, models.Order.user_id == user.id).first()
+        expected_version = parse_if_match(if_match)
+        owned = (models.Order.id == id, models.Order.user_id == user.id, models.Order.deleted_at.is_(None))
 
-        if db_order:
-            db_order.pizza_size = order_data.pizza_size
-            db_order.quantity = order_data.quantity
+        price_table = get_price_table()
+        if order_data.item_id is not None:
+            item_id, unit_price, total_price = price_table.quote(
+                order_data.item_id, order_data.pizza_size, order_data.toppings, order_data.quantity
+            )
+            available = true()
+        else:
+            # keep the item already on the order and price it in the UPDATE itself
+            item_id, unit_price, total_price, available = price_table.quote_column(
+                models.Order.item_id, order_data.pizza_size, order_data.toppings, order_data.quantity
+            )
 
-            db.commit()
+        values = {
+            "pizza_size": order_data.pizza_size,
+            "quantity": order_data.quantity,
+            "item_id": item_id,
+            "toppings": ",".join(order_data.toppings) or None,
+            "unit_price": unit_price,
+            "total_price": total_price,
+        }
+        if order_data.latitude is not None and order_data.longitude is not None:
+            values["delivery_address"] = order_data.delivery_address
+            values["latitude"] = order_data.latitude
+            values["longitude"] = order_data.longitude
+        elif order_data.delivery_address:
+            # the old coordinates belong to the old address
+            values["delivery_address"] = order_data.delivery_address
+            values["latitude"] = None
+            values["longitude"] = None
+
+        updated = update_returning_previous(db, *owned, available, expected_version=expected_version, **values)
+        if updated is None:
+            db_order = db.query(models.Order).filter(*owned).first()
+            if not db_order:
+                return {
+                    "status": "success",
+                    "message": "Order not found"
+                }
+            # raises when the order's item is not sold in the requested size
+            price_table.quote(db_order.item_id, order_data.pizza_size, order_data.toppings, order_data.quantity)
+            raise version_conflict()
+
+        before, db_order = updated
+        record_changed(db, before, OrderFacts.from_order(db_order))
+        record_event(db, ORDER_UPDATED, db_order)
+
+        result = db_order.serialize()
+        db.commit()
 
-            return {
-                "status": "success",
-                "order": db_order.serialize()
-            }
-        else:
-            return {
-                "status": "success",
-                "message": "Order not found"
-            }
-        
+        response.headers["ETag"] = etag(result["version"])
+        return {
+            "status": "success",
+            "order": result
+        }
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(e)
         raise HTTPException(
@@ -156,53 +252,31 @@ async def update_order(db: db_dependency, id: int, order_data: OrderModel, user:
 
 
 @order_router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_order(db: db_dependency, id: int, user: models.User = Depends(get_current_user)):
+@query_budget(queries=5, rows=3)
+async def delete_order(db: db_dependency, id: int, if_match: Optional[str] = Header(None),
+                       user: models.User = Depends(get_current_user)):
 
     try:
-        order = db.query(models.Order).filter(models.Order.id == id, models.Order.user_id == user.id).first()
-        if not order:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Order not found",
-            )
+        expected_version = parse_if_match(if_match)
+        owned = (models.Order.id == id, models.Order.user_id == user.id, models.Order.deleted_at.is_(None))
+
+        deleted = update_returning_previous(db, *owned, expected_version=expected_version, deleted_at=datetime.utcnow())
+        if deleted is None:
+            raise write_failed(db, *owned)
+
+        before, db_order = deleted
+        record_deleted(db, before)
+        record_event(db, ORDER_DELETED, db_order)
 
-        db.delete(order)
         db.commit()
 
         return None
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e),
         )
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
@@ -1,31 +1,43 @@
-from typing import Annotated
+from datetime import date, datetime, timedelta
+from typing import Annotated, Optional
 from fastapi import APIRouter, HTTPException, status
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 from services.auth import get_hash_password, get_current_user, verify_password, token_generator
+from services.rollups import MAX_REPORT_DAYS, OrderFacts, record_changed, record_deleted, revenue_report
+from services.archive import archived_orders, page_with_archived
+from services.search import search_orders
+from services.outbox import ORDER_DELETED, ORDER_STATUS_CHANGED, outbox_backlog, record_event
+from services.orders import MAX_PAGE_SIZE, etag, page, parse_if_match, update_returning_previous, write_failed
+from services.query_budget import query_budget
 from schema.user import LoginModel, SignUpModel
-from schema.order import OrderModel, OrderStatus
+from schema.order import OrderModel, OrderStatus, PizzaSizes
 import models
 from database import get_db
 from logger import logger
-from database import engine
 
 
 
 db_dependency = Annotated[Session, Depends(get_db)]
 
 
+# the most processing orders one dispatch plan considers
+MAX_DISPATCH_ORDERS = 1000
+
+
 staff_router = APIRouter(
     prefix="/staff",
     tags=["staff"],
     responses={404: {"description": "Not found"}},
 )
 
-models.Base.metadata.create_all(bind=engine)
-
 
 @staff_router.get('/', status_code=status.HTTP_200_OK)
-async def list_all_orders(db: db_dependency, user: models.User = Depends(get_current_user)):
+@query_budget(queries=2, rows=102)
+async def list_all_orders(db: db_dependency, include_archived: bool = False,
+                          since: Optional[datetime] = None, until: Optional[datetime] = None,
+                          limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), offset: int = Query(0, ge=0),
+                          user: models.User = Depends(get_current_user)):
 
     try:
         if not user:
@@ -35,12 +47,29 @@ async def list_all_orders(db: db_dependency, user: models.User = Depends(get_cur
             )
         
         if user.is_staff:
-            orders = db.query(models.Order).all()
+            # bounds on created_at let Postgres skip partitions outside the range
+            bounds = []
+            archive_bounds = []
+            if since is not None:
+                bounds.append(models.Order.created_at >= since)
+                archive_bounds.append(models.OrderArchive.created_at >= since)
+            if until is not None:
+                bounds.append(models.Order.created_at < until)
+                archive_bounds.append(models.OrderArchive.created_at < until)
+
+            if include_archived:
+                orders, has_more = page_with_archived(db, bounds, archive_bounds, limit, offset)
+            else:
+                orders, has_more = page(
+                    db.query(models.Order).filter(models.Order.deleted_at.is_(None), *bounds).order_by(models.Order.id),
+                    limit, offset,
+                )
 
             if orders:
                 return {
                     "status": "success",
-                    "orders": [order.serialize() for order in orders]
+                    "orders": [order.serialize() for order in orders],
+                    "next_offset": offset + limit if has_more else None,
                 }
             else:
                 return {"status": "success", 
@@ -57,16 +86,248 @@ async def list_all_orders(db: db_dependency, user: models.User = Depends(get_cur
             detail="Internal server error.",
         )
 
+@staff_router.get('/dispatch/plan', status_code=status.HTTP_200_OK)
+@query_budget(queries=2, rows=1 + MAX_DISPATCH_ORDERS + 1)
+async def plan_dispatch(db: db_dependency, depot_lat: float, depot_lon: float,
+                        max_stops: int = 5, max_radius_km: float = 3.0, window_hours: Optional[int] = None,
+                        max_orders: int = Query(MAX_DISPATCH_ORDERS, ge=1, le=MAX_DISPATCH_ORDERS),
+                        user: models.User = Depends(get_current_user)):
+
+    """
+    ## Groups orders that are ready for delivery into driver routes.
+
+    Parameters:
+    - depot_lat, depot_lon (float): Where every route starts and ends.
+    - max_stops (int): Maximum number of orders per route.
+    - max_radius_km (float): Maximum distance between a route's first stop and any other stop.
+    - window_hours (int): Only consider orders placed within this many hours; all by default.
+    - max_orders (int): Plan at most this many orders, oldest first (at most 1000).
+
+    Returns:
+    - dict: The planned routes, each an ordered list of order ids, the orders that have no coordinates,
+      and whether more orders are waiting than were planned.
+
+    Raises:
+    - HTTPException: If the user is not a staff member or the parameters are invalid.
+    """
+    try:
+        if not user.is_staff:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User is not authorized to perform this action",
+            )
+
+        if max_stops < 1 or max_radius_km <= 0:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="max_stops and max_radius_km must be positive",
+            )
+
+        # imported here so numpy is only loaded by workers that plan routes
+        from services.dispatch import plan_routes
+
+        # a window lets Postgres skip older partitions, at the cost of not
+        # planning orders that have been waiting longer than it
+        recent = []
+        if window_hours is not None:
+            recent.append(models.Order.created_at >= datetime.utcnow() - timedelta(hours=window_hours))
+
+        rows, has_more = page(db.query(models.Order.id, models.Order.latitude, models.Order.longitude).filter(
+            models.Order.order_status == OrderStatus.processing,
+            models.Order.deleted_at.is_(None),
+            *recent,
+        ).order_by(models.Order.created_at, models.Order.id), max_orders, 0)
+
+        located = [row for row in rows if row.latitude is not None and row.longitude is not None]
+        unplaced = [row.id for row in rows if row.latitude is None or row.longitude is None]
+
+        routes = plan_routes(located, (depot_lat, depot_lon), max_stops, max_radius_km)
+
+        return {
+            "status": "success",
+            "routes": [route.serialize() for route in routes],
+            "unplaced": unplaced,
+            "has_more": has_more,
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+@staff_router.get('/reports/revenue', status_code=status.HTTP_200_OK)
+# one rollup row per day, size and status
+@query_budget(queries=2, rows=1 + MAX_REPORT_DAYS * len(PizzaSizes) * len(OrderStatus))
+async def get_revenue_report(db: db_dependency, start: Optional[date] = None, end: Optional[date] = None,
+                             user: models.User = Depends(get_current_user)):
+
+    """
+    ## Returns revenue per day, per pizza size and per order status.
+
+    Parameters:
+    - start, end (date): Inclusive date range of at most 366 days; defaults to the last 30 days.
+
+    Returns:
+    - dict: Order counts, quantities and revenue read from the pre-aggregated rollups.
+
+    Raises:
+    - HTTPException: If the user is not a staff member or the range is invalid.
+    """
+    try:
+        if not user.is_staff:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User is not authorized to perform this action",
+            )
+
+        end = end or datetime.utcnow().date()
+        start = start or end - timedelta(days=29)
+
+        if start > end:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="start must not be after end",
+            )
+
+        if (end - start).days >= MAX_REPORT_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"The report covers at most {MAX_REPORT_DAYS} days",
+            )
+
+        return {
+            "status": "success",
+            "report": revenue_report(db, start, end),
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+@staff_router.get('/outbox', status_code=status.HTTP_200_OK)
+@query_budget(queries=2, rows=2)
+async def get_outbox_backlog(db: db_dependency, user: models.User = Depends(get_current_user)):
+
+    """
+    ## Returns how far the order event relay is behind.
+
+    Returns:
+    - dict: The number of undelivered order events and the age of the oldest one in seconds.
+
+    Raises:
+    - HTTPException: If the user is not a staff member.
+    """
+    try:
+        if not user.is_staff:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User is not authorized to perform this action",
+            )
+
+        return {
+            "status": "success",
+            "outbox": outbox_backlog(db),
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+@staff_router.get('/search', status_code=status.HTTP_200_OK)
+@query_budget(queries=2, rows=102)
+async def search_customer_orders(db: db_dependency, q: str = Query(min_length=3, max_length=100),
+                                 limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0),
+                                 user: models.User = Depends(get_current_user)):
+
+    """
+    ## Finds orders by customer name, email or username.
+
+    Parameters:
+    - q (str): Part of the customer's username, email, first or last name.
+    - limit, offset (int): Page size (at most 100) and position.
+
+    Returns:
+    - dict: Orders of the best matching customers, most relevant first, with the customer and match score.
+
+    Raises:
+    - HTTPException: If the user is not a staff member.
+    """
+    try:
+        if not user.is_staff:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User is not authorized to perform this action",
+            )
+
+        rows, has_more = search_orders(db, q, limit=limit, offset=offset)
+
+        return {
+            "status": "success",
+            "query": q,
+            "limit": limit,
+            "offset": offset,
+            "next_offset": offset + limit if has_more else None,
+            "results": [
+                {
+                    "score": float(score),
+                    "customer": {
+                        "id": customer.id,
+                        "username": customer.username,
+                        "email": customer.email,
+                        "first_name": customer.first_name,
+                        "last_name": customer.last_name,
+                    },
+                    "order": order.serialize(),
+                }
+                for order, customer, score in rows
+            ],
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
 @staff_router.get('/{id}', status_code=status.HTTP_200_OK)
-async def get_order(db: db_dependency, id: int, user: models.User = Depends(get_current_user)):
+@query_budget(queries=3, rows=2)
+async def get_order(db: db_dependency, id: int, response: Response, include_archived: bool = False,
+                    user: models.User = Depends(get_current_user)):
 
     try:
 
         if user.is_staff:
             try:
-                order = db.query(models.Order).filter(models.Order.id == id).first()
+                order = db.query(models.Order).filter(
+                    models.Order.id == id, models.Order.deleted_at.is_(None)
+                ).first()
+
+                if order is None and include_archived:
+                    order = archived_orders(db, models.OrderArchive.id == id).first()
 
                 if order:
+                    response.headers["ETag"] = etag(order.version)
                     return {
                         "status": "success",
                         "order": order.serialize()
@@ -100,7 +361,9 @@ async def get_order(db: db_dependency, id: int, user: models.User = Depends(get_
 
 
 @staff_router.put("/{id}", status_code=status.HTTP_201_CREATED)
-async def update_order_status(db: db_dependency, id: int, order_status: OrderStatus, 
+@query_budget(queries=6, rows=3)
+async def update_order_status(db: db_dependency, id: int, order_status: OrderStatus, response: Response,
+                              if_match: Optional[str] = Header(None),
                               user: models.User = Depends(get_current_user)):
 
     try:
@@ -116,22 +379,29 @@ async def update_order_status(db: db_dependency, id: int, order_status: OrderSta
                 detail="Invalid order status",
             )
 
-        order = db.query(models.Order).filter(models.Order.id == id).first()
-        if not order:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Order not found",
-            )
+        expected_version = parse_if_match(if_match)
+        live = (models.Order.id == id, models.Order.deleted_at.is_(None))
+
+        updated = update_returning_previous(db, *live, expected_version=expected_version, order_status=order_status)
+        if updated is None:
+            raise write_failed(db, *live)
 
-        order.order_status = order_status
+        before, order = updated
+        record_changed(db, before, OrderFacts.from_order(order))
+        record_event(db, ORDER_STATUS_CHANGED, order, previous_status=before.order_status)
+
+        new_version = order.version
         db.commit()
 
+        response.headers["ETag"] = etag(new_version)
         return {
             "status": "success",
-            "order_id": order.id,
+            "order_id": id,
             "new_status": order_status,
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(e)
         raise HTTPException(
@@ -144,7 +414,9 @@ async def update_order_status(db: db_dependency, id: int, order_status: OrderSta
 
 
 @staff_router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_any_order(db: db_dependency, id: int, user: models.User = Depends(get_current_user)):
+@query_budget(queries=5, rows=3)
+async def delete_any_order(db: db_dependency, id: int, if_match: Optional[str] = Header(None),
+                           user: models.User = Depends(get_current_user)):
 
     try:
         if not user.is_staff:
@@ -153,18 +425,23 @@ async def delete_any_order(db: db_dependency, id: int, user: models.User = Depen
                 detail="User is not authorized to perform this action",
             )
 
-        order = db.query(models.Order).filter(models.Order.id == id).first()
-        if not order:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Order not found",
-            )
+        expected_version = parse_if_match(if_match)
+        live = (models.Order.id == id, models.Order.deleted_at.is_(None))
+
+        deleted = update_returning_previous(db, *live, expected_version=expected_version, deleted_at=datetime.utcnow())
+        if deleted is None:
+            raise write_failed(db, *live)
+
+        before, order = deleted
+        record_deleted(db, before)
+        record_event(db, ORDER_DELETED, order)
 
-        db.delete(order)
         db.commit()
 
         return None
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(e)
         raise HTTPException(
@@ -1,12 +1,13 @@
 from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session
-from services.auth import get_hash_password, get_current_user, verify_password, token_generator
+from services.auth import get_hash_password, get_current_user, verify_password, token_generator, check_password, issue_tokens
+from services.orders import MAX_PAGE_SIZE, page
+from services.query_budget import query_budget
 from schema.user import LoginModel, SignUpModel, UpdateUserModel
 import models
 from database import get_db
 from logger import logger
-from database import engine
 
 
 user_router = APIRouter(
@@ -15,12 +16,11 @@ user_router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
-models.Base.metadata.create_all(bind=engine)
-
 db_dependency = Annotated[Session, Depends(get_db)]
 
 
 @user_router.post("/signup", status_code=status.HTTP_201_CREATED)
+@query_budget(queries=4, rows=1)
 async def signup(db: db_dependency, user: SignUpModel):
 
     """
@@ -77,6 +77,7 @@ async def signup(db: db_dependency, user: SignUpModel):
 
 
 @user_router.post("/login", status_code=status.HTTP_200_OK)
+@query_budget(queries=2, rows=1)
 async def login(db: db_dependency, user: LoginModel):
 
     """
@@ -86,7 +87,7 @@ async def login(db: db_dependency, user: LoginModel):
     - user (LoginModel): A model instance containing the user's username and password.
 
     Returns:
-    - dict: A dictionary containing the logged-in user's serialized data and a token.
+    - dict: A dictionary containing the logged-in user's serialized data, an access token and a refresh token.
 
     Raises:
     - HTTPException: If the user with the provided username does not exist or if the password is incorrect.
@@ -96,20 +97,21 @@ async def login(db: db_dependency, user: LoginModel):
         db_user = db.query(models.User).filter(models.User.username == user.username).first()
 
         # Check if the user exists and the password is correct
-        if db_user is None or not verify_password(user.password, db_user.password):
+        if db_user is None or not check_password(db, db_user, user.password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Incorrect username or password",
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        token = await token_generator(db, user.username, user.password)
+        tokens = issue_tokens(db_user)
 
-        # Return user details along with the token
+        # Return user details along with the tokens
         return {
             "status": "success",
             "user": db_user.serialize(),
-            "token": token
+            "token": tokens["access_token"],
+            "refresh_token": tokens["refresh_token"],
         }
     except Exception as e:
         logger.error(e)
@@ -120,17 +122,21 @@ async def login(db: db_dependency, user: LoginModel):
 
 
 @user_router.get("/me", status_code=status.HTTP_200_OK)
-async def get_user_details(db: db_dependency, user: models.User = Depends(get_current_user)):
+@query_budget(queries=2, rows=102)
+async def get_user_details(db: db_dependency,
+                           limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), offset: int = Query(0, ge=0),
+                           user: models.User = Depends(get_current_user)):
     
 
     """
     ## Retrieves the details of the authenticated user.
 
     Parameters:
+    - limit, offset (int): Page size (at most 100) and position in the user's orders.
     - user (models.User): A model instance containing the user's data.
 
     Returns:
-    - dict: A dictionary containing the user's serialized data and their orders (if any).
+    - dict: A dictionary containing the user's serialized data, a page of their orders (if any) and the offset of the next page.
 
     Raises:
     - HTTPException: If the user is not authenticated.
@@ -143,13 +149,16 @@ async def get_user_details(db: db_dependency, user: models.User = Depends(get_cu
                 detail="User not authenticated",
             )
         
-        orders = db.query(models.Order).filter(models.Order.user_id == user.id).all()
+        orders, has_more = page(db.query(models.Order).filter(
+            models.Order.user_id == user.id, models.Order.deleted_at.is_(None)
+        ).order_by(models.Order.id), limit, offset)
 
         if orders:
             return {
                 "status": "success",
                 "user": user.serialize(),
-                "orders": [order.serialize() for order in orders]
+                "orders": [order.serialize() for order in orders],
+                "next_offset": offset + limit if has_more else None,
             }
         else:
             return {
@@ -169,6 +178,7 @@ async def get_user_details(db: db_dependency, user: models.User = Depends(get_cu
 
 
 @user_router.put("/", status_code=status.HTTP_200_OK)
+@query_budget(queries=4, rows=3)
 async def update_user(db: db_dependency, user_details: UpdateUserModel, user: models.User = Depends(get_current_user)):
 
 
@@ -201,6 +211,9 @@ async def update_user(db: db_dependency, user_details: UpdateUserModel, user: mo
             db_user.email = user_details.email
             db_user.first_name = user_details.first_name
             db_user.last_name = user_details.last_name
+            db_user.address = user_details.address
+            db_user.latitude = user_details.latitude
+            db_user.longitude = user_details.longitude
 
             db.commit()
 
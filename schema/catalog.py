@@ -0,0 +1,46 @@
+from typing import Annotated, Dict, Optional
+
+from pydantic import BaseModel, Field
+
+from schema.order import PizzaSizes
+
+
+class MenuItemModel(BaseModel):
+    name: str
+    description: Optional[str] = None
+    is_active: Optional[bool] = True
+    prices: Dict[PizzaSizes, Annotated[int, Field(ge=0)]]
+
+
+    class Config:
+
+        json_schema_extra = {
+            "example": {
+                "name": "Margherita",
+                "description": "Tomato, mozzarella and basil",
+                "is_active": True,
+                "prices": {
+                    "small": 3500,
+                    "medium": 5000,
+                    "large": 6500,
+                    "extra_large": 8000,
+                },
+            }
+        }
+
+
+class ToppingModel(BaseModel):
+    name: str
+    price: int = Field(ge=0)
+    is_active: Optional[bool] = True
+
+
+    class Config:
+
+        json_schema_extra = {
+            "example": {
+                "name": "extra_cheese",
+                "price": 500,
+                "is_active": True,
+            }
+        }
@@ -1,7 +1,7 @@
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class OrderStatus(str, Enum):
@@ -21,8 +21,13 @@ class PizzaSizes(str, Enum):
 
 
 class OrderModel(BaseModel):
-    quantity: int
+    quantity: int = Field(gt=0)
     pizza_size: Optional[PizzaSizes] = PizzaSizes.small
+    delivery_address: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    item_id: Optional[int] = None
+    toppings: List[str] = []
 
 
     class Config:
@@ -31,5 +36,10 @@ class OrderModel(BaseModel):
             "example": {
                 "quantity": 2,
                 "pizza_size": "small",
+                "delivery_address": "12 Marina Road, Lagos",
+                "latitude": 6.4541,
+                "longitude": 3.3947,
+                "item_id": 1,
+                "toppings": ["extra_cheese"],
             }
         }
\ No newline at end of file
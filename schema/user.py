@@ -11,6 +11,9 @@ class SignUpModel(BaseModel):
     password: str
     is_staff: Optional[bool]
     is_active: Optional[bool]
+    address: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
     class Config:
         json_schema_extra = {
@@ -22,6 +25,9 @@ class SignUpModel(BaseModel):
                 "password": "password",
                 "is_staff": False,
                 "is_active": True,
+                "address": "12 Marina Road, Lagos",
+                "latitude": 6.4541,
+                "longitude": 3.3947,
             }
         }
 
@@ -37,6 +43,9 @@ class UpdateUserModel(BaseModel):
     email: EmailStr
     first_name: str
     last_name: str
+    address: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
 
     class Config:
         json_schema_extra = {
@@ -45,5 +54,15 @@ class UpdateUserModel(BaseModel):
                 "email": "johndoe@example.com",
                 "first_name": "John",
                 "last_name": "Doe",
+                "address": "12 Marina Road, Lagos",
+                "latitude": 6.4541,
+                "longitude": 3.3947,
             }
-        }
\ No newline at end of file
+        }
+
+class RefreshTokenModel(BaseModel):
+    refresh_token: str
+
+
+class RevokeTokenModel(BaseModel):
+    refresh_token: Optional[str] = None
@@ -0,0 +1,137 @@
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Tuple
+from sqlalchemy import DateTime, delete, insert, literal, null, or_, select, union_all
+from sqlalchemy.orm import Session
+from schema.order import OrderStatus
+from models import Order, OrderArchive
+from logger import logger
+
+
+TERMINAL_STATUSES = (OrderStatus.delivered, OrderStatus.cancelled)
+
+ARCHIVED_COLUMNS = [column.name for column in Order.__table__.columns]
+
+
+def archived_orders(db: Session, *criteria):
+    """Query archived orders with the same criteria used against the hot table."""
+    return db.query(OrderArchive).filter(OrderArchive.deleted_at.is_(None), *criteria)
+
+
+def page_with_archived(db: Session, live_criteria: list, archived_criteria: list,
+                       limit: int, offset: int) -> Tuple[List[Order], bool]:
+    """Page live and archived orders as one list ordered by id.
+
+    Both tables are read in a single UNION ALL, so a page holds at most
+    ``limit`` orders whichever table they come from. Returns detached
+    ``Order`` and ``OrderArchive`` objects and whether more orders follow.
+    """
+    live = select(
+        *[Order.__table__.c[name] for name in ARCHIVED_COLUMNS],
+        null().cast(DateTime).label("archived_at"),
+    ).where(Order.deleted_at.is_(None), *live_criteria)
+    archived = select(
+        *[OrderArchive.__table__.c[name] for name in ARCHIVED_COLUMNS],
+        OrderArchive.archived_at,
+    ).where(OrderArchive.deleted_at.is_(None), *archived_criteria)
+
+    merged = union_all(live, archived).subquery()
+    rows = db.execute(
+        select(merged).order_by(merged.c.id).offset(offset).limit(limit + 1)
+    ).mappings().all()
+
+    orders = []
+    for row in rows[:limit]:
+        if row["archived_at"] is None:
+            orders.append(Order(**{name: row[name] for name in ARCHIVED_COLUMNS}))
+        else:
+            orders.append(OrderArchive(**row))
+    return orders, len(rows) > limit
+
+
+def archive_batch(db: Session, cutoff: datetime, batch_size: int = 500) -> int:
+    """Move one batch of terminal or soft-deleted orders created before ``cutoff``.
+
+    The copy and the delete run in a single transaction, so an order is
+    always in exactly one of the two tables.
+    """
+    candidates = select(Order.id).where(
+        Order.created_at < cutoff,
+        or_(Order.order_status.in_(TERMINAL_STATUSES), Order.deleted_at.is_not(None)),
+    ).order_by(Order.id).limit(batch_size)
+
+    if db.get_bind().dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+
+    ids = db.execute(candidates).scalars().all()
+    if not ids:
+        return 0
+
+    source = select(
+        *[Order.__table__.c[name] for name in ARCHIVED_COLUMNS],
+        literal(datetime.utcnow()).label("archived_at"),
+    ).where(Order.id.in_(ids))
+
+    db.execute(insert(OrderArchive.__table__).from_select(ARCHIVED_COLUMNS + ["archived_at"], source))
+    db.execute(delete(Order.__table__).where(Order.id.in_(ids)))
+    db.commit()
+
+    return len(ids)
+
+
+def parse_peak_hours(value: str) -> Tuple[Tuple[int, int], ...]:
+    """Parse ``"11-14,17-21"`` into ((11, 14), (17, 21)); end hours are exclusive."""
+    windows = []
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        start, end = part.split("-")
+        windows.append((int(start), int(end)))
+    return tuple(windows)
+
+
+class ArchiveJob:
+    """Moves old orders to the archive in small batches, staying out of peak hours.
+
+    Each batch is its own short transaction and is followed by a pause, so
+    row locks are held briefly and the job never monopolises the database.
+    """
+
+    def __init__(self, session_factory, older_than: timedelta, batch_size: int = 500,
+                 pause: float = 1.0, idle_interval: float = 300.0,
+                 peak_hours: Iterable[Tuple[int, int]] = ()):
+        self.session_factory = session_factory
+        self.older_than = older_than
+        self.batch_size = batch_size
+        self.pause = pause
+        self.idle_interval = idle_interval
+        self.peak_hours = tuple(peak_hours)
+
+    def in_peak(self, now: Optional[datetime] = None) -> bool:
+        hour = (now or datetime.now()).hour
+        return any(start <= hour < end for start, end in self.peak_hours)
+
+    def run_once(self) -> int:
+        moved = 0
+        cutoff = datetime.utcnow() - self.older_than
+        while not self.in_peak():
+            with self.session_factory() as db:
+                count = archive_batch(db, cutoff, self.batch_size)
+            moved += count
+            if count < self.batch_size:
+                break
+            time.sleep(self.pause)
+        return moved
+
+    def run_forever(self):
+        while True:
+            if self.in_peak():
+                time.sleep(self.idle_interval)
+                continue
+
+            try:
+                moved = self.run_once()
+                if moved:
+                    logger.info(f"archived {moved} orders")
+            except Exception as e:
+                logger.error(e)
+
+            time.sleep(self.idle_interval)
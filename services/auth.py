@@ -1,11 +1,13 @@
+import uuid
 from datetime import timedelta, datetime
 from typing import Annotated
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
-from passlib.context import CryptContext
 from models import User
 from database import get_db
-from dotenv import dotenv_values
+from settings import get_settings
+from services.revocation import get_denylist
+from services.hashing import get_pwd_context
 import jwt
 from logger import logger
 from fastapi.security import OAuth2PasswordBearer
@@ -18,28 +20,81 @@ db_dependency = Annotated[Session, Depends(get_db)]
 
 oath2_scheme = OAuth2PasswordBearer(tokenUrl='/auth/token')
 
-config_credentials = dotenv_values(".env")
-
-
-
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated="auto")
-
 
 
 def get_hash_password(password):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password, hash_password):
-    return pwd_context.verify(plain_password, hash_password)
+    return get_pwd_context().verify(plain_password, hash_password)
+
+def check_password(db: Session, user: User, password: str) -> bool:
+    """Verify ``password`` and, when it matches a hash made with outdated parameters, store a fresh hash."""
+    valid, new_hash = get_pwd_context().verify_and_update(password, user.password)
+    if valid and new_hash:
+        user.password = new_hash
+        db.commit()
+    return valid
 
 async def authenticate_user(db: db_dependency, username, password):
     user = db.query(User).filter(User.username == username).first()
-    if user and verify_password(password, user.password):
+    if user and check_password(db, user, password):
         return user
     return False
 
 
 
+def create_token(user: User, token_type: str, lifetime: timedelta) -> str:
+    now = datetime.utcnow()
+    token_data = {
+        "id": user.id,
+        "username": user.username,
+        "type": token_type,
+        "jti": uuid.uuid4().hex,
+        "iat": now,
+        "exp": now + lifetime,
+    }
+    return jwt.encode(token_data, get_settings().secret)
+
+
+def issue_tokens(user: User) -> dict:
+    settings = get_settings()
+    access_lifetime = timedelta(minutes=settings.access_token_minutes)
+    return {
+        "access_token": create_token(user, "access", access_lifetime),
+        "refresh_token": create_token(user, "refresh", timedelta(days=settings.refresh_token_days)),
+        "expires_in": int(access_lifetime.total_seconds()),
+    }
+
+
+def decode_token(token: str, token_type: str) -> dict:
+    try:
+        payload = jwt.decode(
+            token, get_settings().secret, algorithms=['HS256'],
+            options={"require": ["exp", "jti", "type"]},
+        )
+    except jwt.exceptions.ExpiredSignatureError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has expired",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    except jwt.exceptions.InvalidTokenError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if payload["type"] != token_type:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
+
+
 async def token_generator(db: db_dependency, username: str, password: str):
     user = await authenticate_user(db, username, password)
 
@@ -49,19 +104,23 @@ async def token_generator(db: db_dependency, username: str, password: str):
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    token_data = {
-        "id": user.id,
-        "username": user.username,
-    }
 
-    token = jwt.encode(token_data, config_credentials['SECRET'])
+    return issue_tokens(user)
+
 
-    return token
+async def get_token_payload(token: str = Depends(oath2_scheme)) -> dict:
+    payload = decode_token(token, "access")
+    if payload["jti"] in get_denylist():
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return payload
 
 
-async def get_current_user(db: db_dependency, token: str = Depends(oath2_scheme)):
+async def get_current_user(db: db_dependency, payload: dict = Depends(get_token_payload)):
     try:
-        payload = jwt.decode(token, config_credentials['SECRET'], algorithms=['HS256'])
         user = db.query(User).filter(User.id == payload.get("id")).first()
 
         if user is None:
@@ -71,12 +130,8 @@ async def get_current_user(db: db_dependency, token: str = Depends(oath2_scheme)
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-    except jwt.exceptions.DecodeError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -91,8 +146,9 @@ async def get_current_user(db: db_dependency, token: str = Depends(oath2_scheme)
 
 async def very_token(db: db_dependency, token: str):
     try:
-        payload = jwt.decode(token, config_credentials["SECRET"],
-                            algorithms=['HS256'])
+        payload = decode_token(token, "access")
+        if payload["jti"] in get_denylist():
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
         user = db.query(User).filter(User.id == payload.get("id")).first()
 
     except:
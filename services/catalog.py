@@ -0,0 +1,190 @@
+import threading
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+from typing import Mapping, Optional, Sequence, Tuple
+from sqlalchemy import case, false, func, true
+from sqlalchemy.sql import ColumnElement
+from sqlalchemy.orm import Session, selectinload
+from schema.order import PizzaSizes
+from models import MenuItem, MenuPrice, Topping
+from logger import logger
+
+
+@dataclass(frozen=True)
+class PriceTable:
+    """Immutable snapshot of the catalog, keyed for lookups during order creation.
+
+    Prices are in minor currency units. A new table is built on every reload
+    and swapped in whole, so readers never see a half-updated catalog.
+    """
+
+    prices: Mapping[Tuple[int, PizzaSizes], int] = field(default_factory=lambda: MappingProxyType({}))
+    toppings: Mapping[str, int] = field(default_factory=lambda: MappingProxyType({}))
+    items: Tuple[dict, ...] = ()
+    default_item_id: Optional[int] = None
+    fingerprint: tuple = ()
+
+    def quote(self, item_id: Optional[int], pizza_size: PizzaSizes, toppings: Sequence[str], quantity: int):
+        item_id = item_id if item_id is not None else self.default_item_id
+        if item_id is None:
+            # empty catalog: orders are accepted without a price
+            return None, None, None
+
+        try:
+            unit_price = self.prices[(item_id, pizza_size)]
+        except KeyError:
+            raise ValueError(f"Item {item_id} is not available in size {pizza_size.value}")
+
+        unit_price += self.toppings_price(toppings)
+        return item_id, unit_price, unit_price * quantity
+
+    def quote_column(self, item_id: ColumnElement, pizza_size: PizzaSizes, toppings: Sequence[str], quantity: int):
+        """quote() for an item only the database knows, e.g. the one already on an order.
+
+        Returns SQL expressions for the item id, unit price and total, and a
+        condition that is false when the item is not sold in ``pizza_size``.
+        """
+        if self.default_item_id is None:
+            return None, None, None, true()
+
+        item_id = func.coalesce(item_id, self.default_item_id)
+        sized = {item: price for (item, size), price in self.prices.items() if size == pizza_size}
+        if not sized:
+            return item_id, None, None, false()
+
+        unit_price = case(sized, value=item_id) + self.toppings_price(toppings)
+        return item_id, unit_price, unit_price * quantity, item_id.in_(sized)
+
+    def toppings_price(self, toppings: Sequence[str]) -> int:
+        price = 0
+        for name in toppings:
+            try:
+                price += self.toppings[name]
+            except KeyError:
+                raise ValueError(f"Topping {name} is not available")
+        return price
+
+    def serialize(self):
+        return {
+            "items": list(self.items),
+            "toppings": dict(self.toppings),
+        }
+
+    # The two methods below patch in a staff edit without reading the whole
+    # catalog. The fingerprint is kept, so the reloader still replaces the
+    # patched table with a full load on its next poll.
+
+    def with_item(self, item: MenuItem) -> "PriceTable":
+        """A copy with ``item`` and its prices replaced, or removed if it is inactive."""
+        prices = {key: price for key, price in self.prices.items() if key[0] != item.id}
+        items = [served for served in self.items if served["id"] != item.id]
+        if item.is_active:
+            prices.update({(item.id, price.pizza_size): price.price for price in item.prices})
+            items = sorted([*items, item.serialize()], key=lambda served: served["id"])
+        return replace(
+            self,
+            prices=MappingProxyType(prices),
+            items=tuple(items),
+            default_item_id=items[0]["id"] if items else None,
+        )
+
+    def with_topping(self, topping: Topping, previous_name: Optional[str] = None) -> "PriceTable":
+        """A copy with ``topping`` replaced, or removed if it is inactive."""
+        toppings = dict(self.toppings)
+        toppings.pop(previous_name, None)
+        toppings.pop(topping.name, None)
+        if topping.is_active:
+            toppings[topping.name] = topping.price
+        return replace(self, toppings=MappingProxyType(toppings))
+
+
+_price_table = PriceTable()
+
+
+def get_price_table() -> PriceTable:
+    return _price_table
+
+
+def catalog_fingerprint(db: Session) -> tuple:
+    # row counts catch deletes, max(updated_at) catches inserts and edits
+    return tuple(
+        tuple(db.query(func.count(model.id), func.max(model.updated_at)).one())
+        for model in (MenuItem, MenuPrice, Topping)
+    )
+
+
+def load_price_table(db: Session) -> PriceTable:
+    fingerprint = catalog_fingerprint(db)
+
+    items = db.query(MenuItem).options(selectinload(MenuItem.prices)).filter(
+        MenuItem.is_active == True
+    ).order_by(MenuItem.id).all()
+    prices = {}
+    for item in items:
+        for price in item.prices:
+            prices[(item.id, price.pizza_size)] = price.price
+
+    toppings = {
+        topping.name: topping.price
+        for topping in db.query(Topping).filter(Topping.is_active == True).all()
+    }
+
+    return PriceTable(
+        prices=MappingProxyType(prices),
+        toppings=MappingProxyType(toppings),
+        items=tuple(item.serialize() for item in items),
+        default_item_id=items[0].id if items else None,
+        fingerprint=fingerprint,
+    )
+
+
+def reload_price_table(db: Session) -> PriceTable:
+    global _price_table
+    _price_table = load_price_table(db)
+    logger.info(f"price table loaded: {len(_price_table.prices)} prices, {len(_price_table.toppings)} toppings")
+    return _price_table
+
+
+def apply_item(item: MenuItem) -> PriceTable:
+    global _price_table
+    _price_table = _price_table.with_item(item)
+    return _price_table
+
+
+def apply_topping(topping: Topping, previous_name: Optional[str] = None) -> PriceTable:
+    global _price_table
+    _price_table = _price_table.with_topping(topping, previous_name)
+    return _price_table
+
+
+class CatalogReloader:
+    """Polls the catalog fingerprint and reloads the price table when it changes.
+
+    Staff edits are patched into the table of the worker that served them;
+    this keeps every other worker in step and replaces the patched table
+    with a full load.
+    """
+
+    def __init__(self, session_factory, interval: float = 30.0):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="catalog-reloader", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self.session_factory() as db:
+                    if catalog_fingerprint(db) != get_price_table().fingerprint:
+                        reload_price_table(db)
+            except Exception as e:
+                logger.error(e)
@@ -0,0 +1,133 @@
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+@dataclass
+class Route:
+    stops: List[int] = field(default_factory=list)
+    distance_km: float = 0.0
+
+    def serialize(self):
+        return {
+            "stops": self.stops,
+            "distance_km": round(self.distance_km, 3),
+        }
+
+
+def project(coords: np.ndarray, ref_lat: float) -> np.ndarray:
+    """Project (lat, lon) degrees onto a local plane in kilometres.
+
+    An equirectangular projection around the depot latitude is accurate to
+    well under a percent at city scale, and lets every distance below be a
+    plain euclidean norm.
+    """
+    lat = np.radians(coords[:, 0])
+    lon = np.radians(coords[:, 1])
+    x = lon * EARTH_RADIUS_KM * math.cos(math.radians(ref_lat))
+    y = lat * EARTH_RADIUS_KM
+    return np.column_stack((x, y))
+
+
+def distance_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    diff = a[:, None, :] - b[None, :, :]
+    return np.sqrt(np.einsum("ijk,ijk->ij", diff, diff))
+
+
+class GridIndex:
+    """Uniform grid over projected points, bucketed by cell."""
+
+    def __init__(self, points: np.ndarray, cell_size: float):
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], Set[int]] = {}
+        self.cell_of = [tuple(c) for c in np.floor(points / cell_size).astype(np.int64).tolist()]
+
+        for i, cell in enumerate(self.cell_of):
+            self.cells.setdefault(cell, set()).add(i)
+
+    def neighbours(self, i: int) -> List[int]:
+        cx, cy = self.cell_of[i]
+        found = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                bucket = self.cells.get((cx + dx, cy + dy))
+                if bucket:
+                    found.extend(bucket)
+        return found
+
+    def remove(self, i: int):
+        bucket = self.cells[self.cell_of[i]]
+        bucket.discard(i)
+        if not bucket:
+            del self.cells[self.cell_of[i]]
+
+
+def _sequence(points: np.ndarray, depot: np.ndarray) -> Tuple[List[int], float]:
+    # nearest-neighbour tour over a small batch, starting and ending at the depot
+    stops = np.vstack((depot, points))
+    dist = distance_matrix(stops, stops)
+
+    order = []
+    current = 0
+    remaining = set(range(1, len(stops)))
+    total = 0.0
+    while remaining:
+        candidates = np.fromiter(remaining, dtype=np.int64)
+        nxt = int(candidates[np.argmin(dist[current, candidates])])
+        total += dist[current, nxt]
+        order.append(nxt - 1)
+        remaining.remove(nxt)
+        current = nxt
+
+    total += dist[current, 0]
+    return order, float(total)
+
+
+def plan_routes(
+    orders: Sequence[Tuple[int, float, float]],
+    depot: Tuple[float, float],
+    max_stops: int = 5,
+    max_radius_km: float = 3.0,
+) -> List[Route]:
+    """Group orders into delivery routes.
+
+    Orders are seeded farthest-from-depot first; each seed takes its nearest
+    unassigned neighbours within ``max_radius_km`` (looked up through the
+    grid, so only nearby cells are ever compared) until the route is full.
+    """
+    if not orders:
+        return []
+
+    ids = [order[0] for order in orders]
+    coords = np.array([(order[1], order[2]) for order in orders], dtype=np.float64)
+    points = project(coords, depot[0])
+    origin = project(np.array([depot], dtype=np.float64), depot[0])[0]
+
+    grid = GridIndex(points, max_radius_km)
+    assigned = np.zeros(len(points), dtype=bool)
+    seeds = np.argsort(-np.linalg.norm(points - origin, axis=1))
+
+    routes = []
+    for seed in seeds.tolist():
+        if assigned[seed]:
+            continue
+
+        candidates = np.array(grid.neighbours(seed), dtype=np.int64)
+        distances = np.linalg.norm(points[candidates] - points[seed], axis=1)
+        nearby = candidates[distances <= max_radius_km]
+        nearby = nearby[np.argsort(distances[distances <= max_radius_km], kind="stable")]
+        batch = nearby[:max_stops]
+
+        for i in batch.tolist():
+            assigned[i] = True
+            grid.remove(i)
+
+        order, total = _sequence(points[batch], origin)
+        routes.append(Route(stops=[ids[int(batch[j])] for j in order], distance_km=total))
+
+    return routes
@@ -0,0 +1,145 @@
+"""Password hashing with a cost tuned to the machine it runs on.
+
+New passwords are hashed with ``PASSWORD_SCHEME`` (bcrypt or argon2id) at
+the highest cost whose verify time stays under ``PASSWORD_HASH_TARGET_MS``.
+Hashes made with the other scheme, or at a lower cost, still verify and
+are replaced on the user's next successful login.
+
+Calibration takes seconds, so its result is stored in the database and
+reused by every later start and every worker with the same settings.
+``python manage.py calibrate-hashing`` measures again, e.g. after moving
+to different hardware.
+"""
+import time
+from datetime import datetime
+from typing import Optional, Tuple
+from passlib.context import CryptContext
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import PasswordHashCost
+from logger import logger
+
+
+SCHEMES = ("bcrypt", "argon2")
+
+# bcrypt cost is log2 of the number of rounds; argon2's is its time cost
+# (passes over memory) at a fixed memory size
+COST_LIMITS = {
+    "bcrypt": (10, 16),
+    "argon2": (1, 12),
+}
+
+
+def make_context(scheme: str = "bcrypt", cost: Optional[int] = None, argon2_memory_kib: int = 65536) -> CryptContext:
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown password scheme {scheme}; expected one of {', '.join(SCHEMES)}")
+
+    schemes = [scheme] + [other for other in SCHEMES if other != scheme]
+    options = {
+        "argon2__type": "ID",
+        "argon2__memory_cost": argon2_memory_kib,
+    }
+    if cost is not None:
+        # hashes at a higher cost than ours, e.g. from a faster worker, are
+        # left alone; only weaker ones are upgraded
+        options[f"{scheme}__default_rounds"] = cost
+        options[f"{scheme}__min_rounds"] = cost
+
+    return CryptContext(schemes=schemes, default=scheme, deprecated="auto", **options)
+
+
+def verify_seconds(context: CryptContext, samples: int = 3) -> float:
+    stored = context.hash("calibration password")
+    timings = []
+    for _ in range(samples):
+        began = time.perf_counter()
+        context.verify("calibration password", stored)
+        timings.append(time.perf_counter() - began)
+    return min(timings)
+
+
+def calibrate(scheme: str, target_seconds: float, argon2_memory_kib: int = 65536) -> Tuple[int, float]:
+    """Return the highest cost whose verify time stays under ``target_seconds``, and that time.
+
+    Never goes below the scheme's minimum cost, however slow the machine.
+    """
+    low, high = COST_LIMITS[scheme]
+    cost, seconds = low, verify_seconds(make_context(scheme, low, argon2_memory_kib))
+
+    while cost < high:
+        # bcrypt doubles with every step, argon2 grows linearly; skip the
+        # measurement once the estimate is clearly over the target
+        estimate = seconds * 2 if scheme == "bcrypt" else seconds * (cost + 1) / cost
+        if estimate > target_seconds * 1.5:
+            break
+        candidate = verify_seconds(make_context(scheme, cost + 1, argon2_memory_kib))
+        if candidate > target_seconds:
+            break
+        cost, seconds = cost + 1, candidate
+
+    return cost, seconds
+
+
+# arbitrary key for pg_advisory_xact_lock, so one process calibrates while
+# the others wait for its result instead of competing with it for CPU
+CALIBRATION_LOCK_KEY = 7_341_202
+
+
+def calibrated_cost(db: Session, scheme: str, target_ms: float, argon2_memory_kib: int = 65536,
+                    recalibrate: bool = False) -> int:
+    """Return the stored cost for these settings, calibrating and storing it if there is none."""
+    key = {"scheme": scheme, "target_ms": target_ms, "argon2_memory_kib": argon2_memory_kib}
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(CALIBRATION_LOCK_KEY)))
+
+    stored = db.get(PasswordHashCost, key, populate_existing=True)
+    if stored is not None and not recalibrate:
+        db.commit()
+        logger.info(f"password hashing: {scheme} cost {stored.cost}, calibrated {stored.calibrated_at:%Y-%m-%d}")
+        return stored.cost
+
+    cost, seconds = calibrate(scheme, target_ms / 1000, argon2_memory_kib)
+    logger.info(f"password hashing: {scheme} cost {cost} verifies in {seconds * 1000:.0f} ms")
+    if stored is None:
+        stored = PasswordHashCost(**key)
+        db.add(stored)
+    stored.cost, stored.verify_ms, stored.calibrated_at = cost, seconds * 1000, datetime.utcnow()
+    try:
+        db.commit()
+    except IntegrityError:
+        # SQLite: another process calibrated at the same time; agree with it
+        db.rollback()
+        return db.get(PasswordHashCost, key, populate_existing=True).cost
+    return cost
+
+
+_context: Optional[CryptContext] = None
+
+
+def configure_hashing(scheme: str, target_ms: float, cost: Optional[int] = None,
+                      argon2_memory_kib: int = 65536, db: Optional[Session] = None) -> int:
+    """Install the context used by get_pwd_context().
+
+    Uses ``cost`` if given, else the cost stored in ``db``, else calibrates.
+    Returns the cost in use.
+    """
+    global _context
+    if cost is not None:
+        logger.info(f"password hashing: {scheme} cost {cost}")
+    elif db is not None:
+        cost = calibrated_cost(db, scheme, target_ms, argon2_memory_kib)
+    else:
+        cost, seconds = calibrate(scheme, target_ms / 1000, argon2_memory_kib)
+        logger.info(f"password hashing: {scheme} cost {cost} verifies in {seconds * 1000:.0f} ms")
+
+    _context = make_context(scheme, cost, argon2_memory_kib)
+    return cost
+
+
+def get_pwd_context() -> CryptContext:
+    global _context
+    if _context is None:
+        # scripts and tests that never ran the app's startup
+        _context = make_context()
+    return _context
@@ -0,0 +1,111 @@
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from services.rollups import OrderFacts
+from models import Order
+
+
+MAX_PAGE_SIZE = 100
+
+
+def page(query, limit: int, offset: int) -> Tuple[list, bool]:
+    """Return one page of an ordered query and whether more rows follow it."""
+    rows = query.offset(offset).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+
+def etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Return the order version named by an If-Match header, or None when any version is acceptable."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="If-Match must be an order ETag",
+        )
+
+
+def version_conflict():
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="Order was modified by another request",
+    )
+
+
+def order_not_found():
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Order not found",
+    )
+
+
+# what the rollups need from the row as it was before the update
+_PREVIOUS_COLUMNS = (
+    Order.id, Order.version, Order.created_at,
+    Order.pizza_size, Order.order_status, Order.quantity, Order.total_price,
+)
+
+
+def update_returning_previous(db: Session, *criteria, expected_version: Optional[int] = None,
+                              **values) -> Optional[Tuple[OrderFacts, Order]]:
+    """Apply ``values`` to the order matching ``criteria`` and bump its version.
+
+    Returns the rollup facts of the order before the update together with the
+    updated order, or None when nothing matched. In that case the transaction
+    is rolled back. With ``expected_version`` only that version is updated.
+
+    On Postgres this is a single ``UPDATE ... FROM (SELECT ... FOR UPDATE)
+    ... RETURNING``. The locked sub-select supplies the previous values,
+    which RETURNING alone cannot. SQLite does not let RETURNING see the FROM
+    clause, so there the row is read first and the update is guarded by the
+    version that was read.
+    """
+    if expected_version is not None:
+        criteria += (Order.version == expected_version,)
+
+    previous = select(*_PREVIOUS_COLUMNS).where(*criteria)
+    stmt = update(Order).values(version=Order.version + 1, **values).execution_options(synchronize_session=False)
+
+    if db.get_bind().dialect.name == "postgresql":
+        previous = previous.with_for_update().subquery("previous")
+        stmt = stmt.where(
+            Order.id == previous.c.id, Order.created_at == previous.c.created_at
+        ).returning(Order, *previous.c)
+        row = db.execute(stmt).first()
+        result = (OrderFacts.from_order(row), row[0]) if row else None
+    else:
+        row = db.execute(previous).first()
+        order = db.execute(
+            stmt.where(Order.id == row.id, Order.version == row.version).returning(Order)
+        ).scalars().first() if row else None
+        result = (OrderFacts.from_order(row), order) if order else None
+
+    if result is None:
+        # Postgres keeps the row locked after an UPDATE that waited for a
+        # concurrent writer and then failed its WHERE clause; release it now
+        # rather than when the session is eventually closed
+        db.rollback()
+    return result
+
+
+def write_failed(db: Session, *criteria) -> HTTPException:
+    """Tell a missing order (404) from one that changed under the caller (409).
+
+    Only runs after update_returning_previous matched nothing, so the happy
+    path stays at one statement.
+    """
+    current = db.query(Order.version).filter(*criteria).scalar()
+    if current is None:
+        return order_not_found()
+    return version_conflict()
@@ -0,0 +1,247 @@
+"""Order events for downstream systems, published through a transactional outbox.
+
+Order changes add an ``order_events`` row in the same transaction, so an
+event exists exactly when its change was committed. ``OutboxRelay`` drains
+the table in id order and hands each batch to a sink; rows are deleted only
+after the sink accepted them, so delivery is at least once. Consumers should
+skip event ids they have already seen.
+
+The events of one order get increasing ids in the order the changes were
+made, because each change waits for the previous one to commit. Events of
+different orders can commit, and be delivered, out of id order.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+import httpx
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.orm import Session, aliased
+from models import Order, OrderEvent
+from logger import logger
+
+
+ORDER_CREATED = "order.created"
+ORDER_UPDATED = "order.updated"
+ORDER_STATUS_CHANGED = "order.status_changed"
+ORDER_DELETED = "order.deleted"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def record_event(db: Session, event_type: str, order: Order, **extra):
+    """Add an event for ``order`` to the current transaction; the caller commits."""
+    db.add(OrderEvent(
+        event_type=event_type,
+        order_id=order.id,
+        payload=json.dumps({"order": order.serialize(), **extra}, default=_json_default),
+    ))
+
+
+def envelope(event: OrderEvent) -> dict:
+    return {
+        "id": event.id,
+        "type": event.event_type,
+        "order_id": event.order_id,
+        "created_at": event.created_at.isoformat(),
+        "data": json.loads(event.payload),
+    }
+
+
+class FileSink:
+    """Appends events to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, events: List[dict]):
+        with open(self.path, "a", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+class QueueSink:
+    """Puts events on an in-process queue, for consumers running in the same process.
+
+    Not available through ``make_sink``: a worker or ``relay-events`` would
+    delete the events from the outbox with nothing reading the queue.
+    """
+
+    def __init__(self, events: Optional[queue.Queue] = None):
+        self.events = events if events is not None else queue.Queue()
+
+    def send(self, events: List[dict]):
+        for event in events:
+            self.events.put(event)
+
+
+class HttpSink:
+    """POSTs each batch as ``{"events": [...]}``; any non-2xx response fails the batch."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, events: List[dict]):
+        response = httpx.post(self.url, json={"events": events}, timeout=self.timeout)
+        response.raise_for_status()
+
+
+def make_sink(spec: str):
+    """Build a sink from ``file:PATH`` or an ``http(s)://`` URL."""
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    if spec.startswith(("http://", "https://")):
+        return HttpSink(spec)
+    raise ValueError(f"Unknown outbox sink {spec!r}; expected file:PATH or an http(s) URL")
+
+
+def outbox_backlog(db: Session, now: Optional[datetime] = None) -> dict:
+    """Undelivered events and the age of the oldest, wherever the relay runs."""
+    now = now or datetime.utcnow()
+    pending, oldest = db.query(func.count(OrderEvent.id), func.min(OrderEvent.created_at)).one()
+    return {
+        "pending": pending,
+        "oldest_pending_seconds": (now - oldest).total_seconds() if oldest else 0.0,
+    }
+
+
+# arbitrary key for pg_try_advisory_xact_lock, shared by every relay
+RELAY_LOCK_KEY = 7_341_201
+
+
+class OutboxRelay:
+    """Delivers outbox events to a sink in batches of ``batch_size``.
+
+    Several relays may run at once, e.g. one per worker, but only one holds
+    a claim on a batch at a time, so batches go out in order. A relay claims
+    its batch for ``lease`` seconds and commits before calling the sink, so
+    no transaction or pooled connection is held while the sink works, and
+    other relays skip the round instead of waiting. A batch the sink rejects
+    is released and retried after ``interval`` seconds; the claim of a relay
+    that died mid-delivery expires after ``lease`` seconds.
+    """
+
+    def __init__(self, session_factory, sink, batch_size: int = 100, interval: float = 1.0,
+                 lease: float = 60.0, report_interval: float = 60.0):
+        self.session_factory = session_factory
+        self.sink = sink
+        self.batch_size = batch_size
+        self.interval = interval
+        self.lease = lease
+        self.report_interval = report_interval
+        self.delivered = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_lag_seconds = 0.0
+        self.last_delivered_at: Optional[datetime] = None
+        self._reported_at = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def claim(self) -> List[dict]:
+        """Claim the oldest batch, unless another relay holds a claim. Returns its envelopes."""
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            if db.get_bind().dialect.name == "postgresql":
+                # makes the check for other claims and the claim itself atomic;
+                # SQLite runs the single UPDATE below under its write lock
+                if not db.execute(select(func.pg_try_advisory_xact_lock(RELAY_LOCK_KEY))).scalar():
+                    return []
+
+            head, claimed = aliased(OrderEvent), aliased(OrderEvent)
+            events = db.execute(
+                update(OrderEvent)
+                .where(
+                    OrderEvent.id.in_(select(head.id).order_by(head.id).limit(self.batch_size)),
+                    ~exists().where(claimed.claimed_until > now),
+                )
+                .values(claimed_until=now + timedelta(seconds=self.lease))
+                .returning(OrderEvent)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            batch = [envelope(event) for event in sorted(events, key=lambda event: event.id)]
+            db.commit()
+        return batch
+
+    def settle(self, ids: List[int], delivered: bool):
+        """Delete delivered events, or release the claim on events the sink rejected."""
+        with self.session_factory() as db:
+            if delivered:
+                db.execute(delete(OrderEvent).where(OrderEvent.id.in_(ids)))
+            else:
+                db.execute(update(OrderEvent).where(OrderEvent.id.in_(ids)).values(claimed_until=None))
+            db.commit()
+
+    def drain_once(self) -> int:
+        """Deliver one batch. Returns the number of events delivered."""
+        batch = self.claim()
+        if not batch:
+            return 0
+
+        ids = [event["id"] for event in batch]
+        try:
+            self.sink.send(batch)
+        except Exception:
+            self.settle(ids, delivered=False)
+            raise
+        self.settle(ids, delivered=True)
+
+        now = datetime.utcnow()
+        oldest = min(datetime.fromisoformat(event["created_at"]) for event in batch)
+        self.delivered += len(ids)
+        self.batches += 1
+        self.last_lag_seconds = (now - oldest).total_seconds()
+        self.last_delivered_at = now
+        return len(ids)
+
+    def drain(self) -> int:
+        """Deliver batches until the outbox is empty."""
+        delivered = 0
+        while not self._stop.is_set():
+            count = self.drain_once()
+            delivered += count
+            if count < self.batch_size:
+                break
+        return delivered
+
+    def metrics(self) -> dict:
+        return {
+            "delivered": self.delivered,
+            "batches": self.batches,
+            "failures": self.failures,
+            "last_lag_seconds": self.last_lag_seconds,
+            "last_delivered_at": self.last_delivered_at,
+        }
+
+    def run_forever(self):
+        while not self._stop.is_set():
+            try:
+                self.drain()
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"outbox delivery failed: {e}")
+
+            if time.monotonic() - self._reported_at >= self.report_interval:
+                self._reported_at = time.monotonic()
+                logger.info(f"outbox relay: {self.metrics()}")
+
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run_forever, name="outbox-relay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=max(self.interval, 10.0))
@@ -0,0 +1,182 @@
+"""Profiling a live worker, for when latency spikes and the cause is inside it.
+
+Two tools, both only installed with ``PROFILING=true``:
+
+- ``SamplingProfiler`` samples every thread's stack at a fixed interval
+  for a few seconds and returns collapsed stacks (``a;b;c 12`` per line),
+  which flamegraph.pl and speedscope read. Sampling the event loop thread
+  shows whatever blocks it.
+- ``RequestProfilerMiddleware`` runs one request under cProfile when a
+  staff member sends the ``X-Profile`` header. The output is kept in
+  memory and the response carries its id in ``X-Profile-Id``.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from datetime import datetime
+from typing import Deque, Dict, List, Optional
+from fastapi import HTTPException
+from database import SessionLocal
+from models import User
+from services.auth import decode_token
+from services.revocation import get_denylist
+from logger import logger
+
+
+def code_name(code) -> str:
+    path = code.co_filename.split(os.sep)
+    name = getattr(code, "co_qualname", code.co_name)
+    # ';' separates frames in the collapsed format
+    return f"{name} ({'/'.join(path[-2:])}:{code.co_firstlineno})".replace(";", ":")
+
+
+class SamplingProfiler:
+    """Counts how often each stack is on CPU, or waiting, across all threads."""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.samples = 0
+
+    def sample(self, counts: Counter):
+        # stacks are counted as tuples of code objects and only named once
+        # sampling is over, to keep each sample short
+        own = threading.get_ident()
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            counts[(thread_id, tuple(stack))] += 1
+        self.samples += 1
+
+    def run(self, seconds: float) -> Counter:
+        """Sample for ``seconds`` and return sample counts per stack, named root first."""
+        counts: Counter = Counter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            self.sample(counts)
+            time.sleep(self.interval)
+
+        threads = {thread.ident: thread.name for thread in threading.enumerate()}
+        names: Dict = {}
+        stacks: Counter = Counter()
+        for (thread_id, codes), count in counts.items():
+            frames = [names.setdefault(code, code_name(code)) for code in reversed(codes)]
+            stacks[";".join([threads.get(thread_id, f"thread-{thread_id}"), *frames])] += count
+        return stacks
+
+
+def collapsed(stacks: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+_sampling = threading.Lock()
+
+
+def sample_stacks(seconds: float, interval: float) -> Optional[str]:
+    """Sample for ``seconds`` and return collapsed stacks, or None if another run is in progress."""
+    if not _sampling.acquire(blocking=False):
+        return None
+    try:
+        profiler = SamplingProfiler(interval)
+        counts = profiler.run(seconds)
+        logger.info(f"sampled {profiler.samples} times over {seconds:.0f} s")
+        return collapsed(counts)
+    finally:
+        _sampling.release()
+
+
+PROFILE_HEADER = b"x-profile"
+SORT_KEYS = ("cumulative", "tottime", "calls")
+
+# most recent request profiles, newest last
+_captures: Deque[Dict] = deque(maxlen=20)
+
+
+def request_profiles() -> List[Dict]:
+    return [{key: value for key, value in capture.items() if key != "stats"} for capture in _captures]
+
+
+def request_profile(capture_id: str) -> Optional[Dict]:
+    return next((capture for capture in _captures if capture["id"] == capture_id), None)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _is_staff(scope) -> bool:
+    authorization = _header(scope, b"authorization") or ""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        payload = decode_token(token, "access")
+    except HTTPException:
+        return False
+    if payload["jti"] in get_denylist():
+        return False
+    with SessionLocal() as db:
+        user = db.get(User, payload.get("id"))
+        return bool(user and user.is_staff)
+
+
+class RequestProfilerMiddleware:
+    """Profiles single requests flagged with ``X-Profile: 1`` (or a pstats sort key).
+
+    Only staff requests are profiled, one at a time. cProfile follows the
+    event loop thread, so other requests interleaved with the flagged one
+    show up in its profile too.
+    """
+
+    def __init__(self, app, lines: int = 60):
+        self.app = app
+        self.lines = lines
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        flag = _header(scope, PROFILE_HEADER) if scope["type"] == "http" else None
+        if not flag or not _is_staff(scope) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        capture_id = uuid.uuid4().hex[:12]
+        sort = flag if flag in SORT_KEYS else "cumulative"
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", capture_id.encode())]}
+            await send(message)
+
+        profile = cProfile.Profile()
+        began = time.perf_counter()
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.disable()
+            duration = time.perf_counter() - began
+            self._busy.release()
+
+            stream = io.StringIO()
+            pstats.Stats(profile, stream=stream).strip_dirs().sort_stats(sort).print_stats(self.lines)
+            _captures.append({
+                "id": capture_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "duration_ms": round(duration * 1000, 2),
+                "captured_at": datetime.utcnow(),
+                "stats": stream.getvalue(),
+            })
@@ -0,0 +1,151 @@
+"""Per-route limits on the SQL a request may run.
+
+Routes declare how many statements they send and how many rows they read
+back with ``@query_budget(queries=..., rows=...)``. Listings are paged so
+that their rows have a bound too.
+
+With ``QUERY_BUDGETS=warn`` or ``strict`` every request records the
+statements it sends through the engine and the rows its session reads. A
+request over its route's budget, or to a route without one, is logged;
+in strict mode it also fails with a 500 so that the test run fails with
+it (tests/test_query_budgets.py calls every route). With the default ``off``
+no listener or middleware is installed. Rows are counted by buffering
+each result, which is fine for tests but not free.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from logger import logger
+
+
+MODES = ("off", "warn", "strict")
+
+
+class QueryBudget(NamedTuple):
+    queries: int
+    rows: Optional[int] = None
+
+
+def query_budget(queries: int, rows: Optional[int] = None):
+    """Declare the most statements and rows one request to the decorated route may use."""
+    def decorate(endpoint):
+        endpoint.query_budget = QueryBudget(queries, rows)
+        return endpoint
+    return decorate
+
+
+def budget_of(endpoint) -> Optional[QueryBudget]:
+    return getattr(endpoint, "query_budget", None)
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.statements: List[str] = []
+        self.rows = 0
+
+
+_recorder: ContextVar[Optional[QueryRecorder]] = ContextVar("query_recorder", default=None)
+
+
+@contextmanager
+def recording():
+    """Record the statements and rows of everything run in this context."""
+    recorder = QueryRecorder()
+    token = _recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorder.reset(token)
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    recorder = _recorder.get()
+    if recorder is not None:
+        recorder.statements.append(statement)
+
+
+def _record_rows(orm_execute_state):
+    recorder = _recorder.get()
+    if recorder is None:
+        return None
+
+    result = orm_execute_state.invoke_statement()
+    if not getattr(result, "returns_rows", True):
+        return result
+    # the driver does not say how many rows a SELECT returned (sqlite3
+    # reports -1), so buffer them and hand back an equivalent result
+    frozen = result.freeze()
+    recorder.rows += len(frozen.data)
+    return frozen()
+
+
+def install_query_budgets(engine: Engine, session_factory):
+    # the lifespan can run more than once per process, e.g. under tests
+    if not event.contains(engine, "before_cursor_execute", _record_statement):
+        event.listen(engine, "before_cursor_execute", _record_statement)
+    if not event.contains(session_factory, "do_orm_execute", _record_rows):
+        event.listen(session_factory, "do_orm_execute", _record_rows)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+# route -> (most statements, most rows) seen in one request
+_usage: Dict[str, Tuple[int, int]] = {}
+
+
+def route_usage() -> Dict[str, Tuple[int, int]]:
+    return dict(_usage)
+
+
+def route_name(route) -> str:
+    return f"{' '.join(sorted(route.methods))} {route.path}"
+
+
+def check_budget(route, recorder: QueryRecorder) -> Optional[str]:
+    """Note the request's usage and describe how it broke the route's budget, if it did."""
+    name = route_name(route)
+    queries, rows = len(recorder.statements), recorder.rows
+    seen = _usage.get(name, (0, 0))
+    _usage[name] = (max(seen[0], queries), max(seen[1], rows))
+
+    budget = budget_of(route.endpoint)
+    if budget is None:
+        return f"{name} has no query budget; it ran {queries} statements returning {rows} rows"
+    if queries > budget.queries:
+        return f"{name} ran {queries} statements, budget {budget.queries}"
+    if budget.rows is not None and rows > budget.rows:
+        return f"{name} read {rows} rows, budget {budget.rows}"
+    return None
+
+
+class QueryBudgetMiddleware:
+    """Checks every request against the budget of the route it was routed to."""
+
+    def __init__(self, app, strict: bool = False):
+        self.app = app
+        self.strict = strict
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with recording() as recorder:
+            async def checked_send(message):
+                # the route has finished by the time its response starts;
+                # raising here still turns the response into a 500
+                route = scope.get("route")
+                if message["type"] == "http.response.start" and route is not None:
+                    problem = check_budget(route, recorder)
+                    if problem:
+                        statements = "\n".join(f"  {sql}" for sql in recorder.statements)
+                        logger.warning(f"query budget exceeded: {problem}\n{statements}")
+                        if self.strict:
+                            raise QueryBudgetExceeded(problem)
+                await send(message)
+
+            await self.app(scope, receive, checked_send)
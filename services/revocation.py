@@ -0,0 +1,180 @@
+import hashlib
+import math
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import RevokedToken
+from logger import logger
+
+
+class BloomFilter:
+    """Fixed-size set membership with false positives but no false negatives."""
+
+    def __init__(self, capacity: int = 10_000, error_rate: float = 0.001):
+        self.capacity = capacity
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        # double hashing: k positions out of one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class Denylist:
+    """Ids of revoked access tokens that have not expired yet.
+
+    Checked on every authenticated request. Almost every token is not
+    revoked, and the bloom filter answers that on its own; the exact set
+    only confirms its hits. Entries are dropped once the token expires,
+    since an expired token is rejected anyway.
+    """
+
+    def __init__(self, capacity: int = 10_000, error_rate: float = 0.001):
+        self.error_rate = error_rate
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._expires: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, jti: str) -> bool:
+        return jti in self._bloom and jti in self._expires
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def add(self, entries: Iterable[Tuple[str, datetime]]):
+        with self._lock:
+            for jti, expires_at in entries:
+                if jti in self._expires:
+                    continue
+                self._expires[jti] = expires_at
+                self._bloom.add(jti)
+
+            if len(self._expires) > self._bloom.capacity:
+                # past capacity the false positive rate climbs; start over
+                # bigger, with room to spare after a bulk add
+                self._rebuild(self._expires, max(2 * self._bloom.capacity, 2 * len(self._expires)))
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        now = now or datetime.utcnow()
+        with self._lock:
+            live = {jti: expires_at for jti, expires_at in self._expires.items() if expires_at > now}
+            pruned = len(self._expires) - len(live)
+            if pruned:
+                self._rebuild(live, self._bloom.capacity)
+        return pruned
+
+    def _rebuild(self, entries: Dict[str, datetime], capacity: int):
+        # readers keep using the old structures until both are swapped
+        bloom = BloomFilter(capacity, self.error_rate)
+        for jti in entries:
+            bloom.add(jti)
+        self._bloom, self._expires = bloom, dict(entries)
+
+
+_denylist = Denylist()
+
+
+def get_denylist() -> Denylist:
+    return _denylist
+
+
+def revoke_token(db: Session, payload: dict) -> bool:
+    """Record a decoded token as revoked. Returns False if it already was.
+
+    Revoked access tokens reach every worker's denylist on the next sync;
+    this worker's is updated right away.
+    """
+    expires_at = datetime.utcfromtimestamp(payload["exp"])
+    db.add(RevokedToken(
+        jti=payload["jti"],
+        token_type=payload["type"],
+        user_id=payload.get("id"),
+        expires_at=expires_at,
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+
+    if payload["type"] == "access":
+        get_denylist().add([(payload["jti"], expires_at)])
+    return True
+
+
+class DenylistSync:
+    """Keeps this worker's denylist in step with the revoked_tokens table.
+
+    Every ``interval`` seconds it loads access tokens revoked since the last
+    sync and drops expired entries. Expired rows are deleted from the table
+    every ``prune_interval`` seconds.
+    """
+
+    # revocations committed late, or stamped by a host with a slower clock,
+    # are still picked up
+    OVERLAP = timedelta(seconds=60)
+
+    def __init__(self, session_factory, interval: float = 5.0, prune_interval: float = 600.0,
+                 denylist: Optional[Denylist] = None):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.prune_interval = prune_interval
+        self.denylist = denylist if denylist is not None else get_denylist()
+        self._synced_at: Optional[datetime] = None
+        self._pruned_at = datetime.min
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sync(self, db: Session):
+        now = datetime.utcnow()
+        query = db.query(RevokedToken.jti, RevokedToken.expires_at).filter(
+            RevokedToken.token_type == "access", RevokedToken.expires_at > now,
+        )
+        if self._synced_at is not None:
+            query = query.filter(RevokedToken.revoked_at >= self._synced_at - self.OVERLAP)
+
+        self.denylist.add(query.all())
+        self._synced_at = now
+        self.denylist.prune(now)
+
+        if now - self._pruned_at >= timedelta(seconds=self.prune_interval):
+            deleted = db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete(synchronize_session=False)
+            db.commit()
+            self._pruned_at = now
+            if deleted:
+                logger.info(f"pruned {deleted} expired revoked tokens")
+
+    def start(self):
+        with self.session_factory() as db:
+            self.sync(db)
+        logger.info(f"token denylist loaded: {len(self.denylist)} revoked tokens")
+
+        self._thread = threading.Thread(target=self._run, name="denylist-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                with self.session_factory() as db:
+                    self.sync(db)
+            except Exception as e:
+                logger.error(e)
@@ -0,0 +1,190 @@
+from datetime import date, datetime
+from typing import Dict, List, NamedTuple, Tuple
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+from sqlalchemy.dialects import postgresql, sqlite
+from schema.order import OrderStatus, PizzaSizes
+from models import Order, OrderArchive, RevenueRollup
+
+
+# the longest range revenue_report() is asked for, in days
+MAX_REPORT_DAYS = 366
+
+
+class OrderFacts(NamedTuple):
+    """The parts of an order that the revenue rollups are keyed and summed on."""
+
+    day: date
+    pizza_size: PizzaSizes
+    order_status: OrderStatus
+    quantity: int
+    revenue: int
+
+    @classmethod
+    def from_order(cls, order: Order) -> "OrderFacts":
+        return cls(
+            day=(order.created_at or datetime.utcnow()).date(),
+            pizza_size=order.pizza_size,
+            order_status=order.order_status,
+            quantity=order.quantity,
+            revenue=order.total_price or 0,
+        )
+
+
+def _upsert(db: Session, facts: OrderFacts, sign: int):
+    values = {
+        "day": facts.day,
+        "pizza_size": facts.pizza_size,
+        "order_status": facts.order_status,
+        "order_count": sign,
+        "quantity": sign * facts.quantity,
+        "revenue": sign * facts.revenue,
+    }
+    table = RevenueRollup.__table__
+    dialect = db.get_bind().dialect.name
+
+    if dialect in ("postgresql", "sqlite"):
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        stmt = insert(table).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.pizza_size, table.c.order_status],
+            set_={
+                "order_count": table.c.order_count + stmt.excluded.order_count,
+                "quantity": table.c.quantity + stmt.excluded.quantity,
+                "revenue": table.c.revenue + stmt.excluded.revenue,
+            },
+        )
+        db.execute(stmt)
+        return
+
+    row = db.get(RevenueRollup, (facts.day, facts.pizza_size, facts.order_status))
+    if row is None:
+        db.add(RevenueRollup(**values))
+    else:
+        row.order_count += values["order_count"]
+        row.quantity += values["quantity"]
+        row.revenue += values["revenue"]
+
+
+def record_created(db: Session, order: Order):
+    _upsert(db, OrderFacts.from_order(order), 1)
+
+
+def record_deleted(db: Session, facts: OrderFacts):
+    _upsert(db, facts, -1)
+
+
+def record_changed(db: Session, before: OrderFacts, after: OrderFacts):
+    if before == after:
+        return
+    # touch rollup rows in key order so that concurrent changes in opposite
+    # directions (pending -> processing and back) cannot deadlock
+    deltas = sorted(
+        [(before, -1), (after, 1)],
+        key=lambda delta: (delta[0].day, delta[0].pizza_size.value, delta[0].order_status.value),
+    )
+    for facts, sign in deltas:
+        _upsert(db, facts, sign)
+
+
+def revenue_report(db: Session, start: date, end: date) -> dict:
+    rows = db.query(RevenueRollup).filter(RevenueRollup.day >= start, RevenueRollup.day <= end).all()
+
+    def bucket():
+        return {"order_count": 0, "quantity": 0, "revenue": 0}
+
+    totals = bucket()
+    by_day: Dict[date, dict] = {}
+    by_size: Dict[str, dict] = {}
+    by_status: Dict[str, dict] = {}
+
+    for row in rows:
+        for target in (
+            totals,
+            by_day.setdefault(row.day, bucket()),
+            by_size.setdefault(row.pizza_size.value, bucket()),
+            by_status.setdefault(row.order_status.value, bucket()),
+        ):
+            target["order_count"] += row.order_count
+            target["quantity"] += row.quantity
+            target["revenue"] += row.revenue
+
+    return {
+        "start": start,
+        "end": end,
+        "totals": totals,
+        "by_day": [{"day": day, **by_day[day]} for day in sorted(by_day)],
+        "by_size": by_size,
+        "by_status": by_status,
+    }
+
+
+def compute_rollups(db: Session) -> Dict[Tuple[date, PizzaSizes, OrderStatus], Tuple[int, int, int]]:
+    result = {}
+    # archived orders keep counting towards revenue; soft-deleted ones never do
+    for model in (Order, OrderArchive):
+        day = func.date(model.created_at)
+        rows = db.query(
+            day,
+            model.pizza_size,
+            model.order_status,
+            func.count(model.id),
+            func.sum(model.quantity),
+            func.sum(func.coalesce(model.total_price, 0)),
+        ).filter(model.deleted_at.is_(None)).group_by(day, model.pizza_size, model.order_status).all()
+
+        for row_day, size, order_status, count, quantity, revenue in rows:
+            if isinstance(row_day, str):
+                row_day = date.fromisoformat(row_day)
+            totals = result.get((row_day, size, order_status), (0, 0, 0))
+            result[(row_day, size, order_status)] = (
+                totals[0] + count, totals[1] + (quantity or 0), totals[2] + (revenue or 0)
+            )
+    return result
+
+
+def stored_rollups(db: Session) -> Dict[Tuple[date, PizzaSizes, OrderStatus], Tuple[int, int, int]]:
+    return {
+        (row.day, row.pizza_size, row.order_status): (row.order_count, row.quantity, row.revenue)
+        for row in db.query(RevenueRollup).all()
+        if row.order_count or row.quantity or row.revenue
+    }
+
+
+def rebuild_rollups(db: Session, check_only: bool = False) -> List[dict]:
+    """Recompute the rollups from the orders table and compare them with what is stored.
+
+    Returns the keys whose stored values differ. Unless ``check_only`` is set
+    the stored rollups are replaced with the recomputed ones.
+    """
+    if not check_only and db.get_bind().dialect.name == "postgresql":
+        # writers block on their rollup upsert until the rebuild commits, and
+        # then apply their delta on top of totals that did not include it
+        db.execute(text("LOCK TABLE revenue_rollups IN EXCLUSIVE MODE"))
+
+    expected = compute_rollups(db)
+    stored = stored_rollups(db)
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored), key=lambda k: (k[0], k[1].value, k[2].value)):
+        if expected.get(key) != stored.get(key):
+            mismatches.append({
+                "day": key[0],
+                "pizza_size": key[1].value,
+                "order_status": key[2].value,
+                "expected": expected.get(key),
+                "stored": stored.get(key),
+            })
+
+    if not check_only:
+        db.query(RevenueRollup).delete()
+        db.add_all(
+            RevenueRollup(
+                day=key[0], pizza_size=key[1], order_status=key[2],
+                order_count=count, quantity=quantity, revenue=revenue,
+            )
+            for key, (count, quantity, revenue) in expected.items()
+        )
+        db.commit()
+
+    return mismatches
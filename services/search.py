@@ -0,0 +1,130 @@
+"""Order lookup by customer name, email or username.
+
+Three backends, picked per database:
+
+- ``trigram``: Postgres with pg_trgm. A GIN trigram index on the user's
+  search document serves substring matches (partial emails) and typo
+  tolerant word matches, ranked by word similarity.
+- ``fulltext``: Postgres without pg_trgm. A GIN index on a stored
+  ``simple`` tsvector serves word prefix matches, ranked by ts_rank.
+- ``fts5``: SQLite. A trigram FTS5 table kept in sync by triggers, ranked
+  by bm25.
+
+The indexes are created by ``migrations.ensure_search_indexes``.
+"""
+import re
+from typing import Dict, List, Tuple
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from models import Order, User
+
+
+SEARCH_FIELDS = ("username", "email", "first_name", "last_name")
+
+# broad queries ("smith") match a large share of users; only the best
+# ranked are joined to their orders
+MAX_CANDIDATES = 1000
+
+# generated column on users holding search_vector(), Postgres fulltext only
+SEARCH_VECTOR_COLUMN = "search_vector"
+
+users_fts = table("users_fts", column("rowid"))
+
+
+def search_document():
+    separator = literal_column("' '")
+    document = getattr(User, SEARCH_FIELDS[0])
+    for name in SEARCH_FIELDS[1:]:
+        document = document.concat(separator).concat(getattr(User, name))
+    return func.lower(document)
+
+
+def search_vector():
+    # split emails into words; the parser would keep them as one token
+    words = func.translate(search_document(), literal_column("'@.'"), literal_column("'  '"))
+    return func.to_tsvector(literal_column("'simple'::regconfig"), words)
+
+
+def index_expression(expression) -> str:
+    return str(expression.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+_backends: Dict[str, str] = {}
+
+
+def search_backend(engine: Engine) -> str:
+    key = str(engine.url)
+    if key not in _backends:
+        if engine.dialect.name == "sqlite":
+            _backends[key] = "fts5"
+        else:
+            with engine.connect() as conn:
+                has_trigram = conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first()
+            _backends[key] = "trigram" if has_trigram else "fulltext"
+    return _backends[key]
+
+
+def search_terms(query: str) -> List[str]:
+    return re.findall(r"[\w@.+-]+", query.lower())
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def matching_users(db: Session, query: str):
+    """Subquery of (id, score) for the ``MAX_CANDIDATES`` users best matching ``query``.
+
+    Higher scores rank first.
+    """
+    backend = search_backend(db.get_bind())
+    terms = search_terms(query)
+
+    if backend == "trigram":
+        document = search_document()
+        phrase = " ".join(terms)
+        score = func.word_similarity(phrase, document)
+        candidates = select(User.id.label("id"), score.label("score")).where(or_(
+            document.ilike(f"%{_escape_like(phrase)}%", escape="\\"),
+            document.op("%>")(phrase),
+        ))
+
+    elif backend == "fulltext":
+        vector = literal_column(f"users.{SEARCH_VECTOR_COLUMN}")
+        words = re.findall(r"[^\W_]+", " ".join(terms))
+        terms_query = " & ".join(f"'{word}':*" for word in words) or "''"
+        ts_query = func.to_tsquery(literal_column("'simple'::regconfig"), terms_query)
+        score = func.ts_rank(vector, ts_query)
+        candidates = select(User.id.label("id"), score.label("score")).where(vector.op("@@")(ts_query))
+    else:
+        # the trigram tokenizer cannot match anything shorter than three characters
+        phrases = " ".join('"' + term.replace('"', '""') + '"' for term in terms if len(term) >= 3)
+        score = -func.bm25(literal_column("users_fts"))
+        candidates = select(users_fts.c.rowid.label("id"), score.label("score")).where(
+            text("users_fts MATCH :phrases").bindparams(phrases=phrases or '""')
+        )
+
+    # ties are broken by id so pages stay stable between requests
+    return candidates.order_by(score.desc(), candidates.selected_columns.id).limit(MAX_CANDIDATES).subquery("matches")
+
+
+def search_orders(db: Session, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[tuple], bool]:
+    """Orders of the customers best matching ``query``, most relevant customer first.
+
+    Only the ``MAX_CANDIDATES`` best matching customers are considered.
+    Returns (order, customer, score) rows and whether more rows follow.
+    """
+    matches = matching_users(db, query)
+    rows = (
+        db.query(Order, User, matches.c.score)
+        .join(matches, matches.c.id == Order.user_id)
+        .join(User, User.id == Order.user_id)
+        .filter(Order.deleted_at.is_(None))
+        .order_by(matches.c.score.desc(), Order.created_at.desc(), Order.id.desc())
+        .limit(limit + 1)
+        .offset(offset)
+        .all()
+    )
+    return rows[:limit], len(rows) > limit
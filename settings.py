@@ -0,0 +1,79 @@
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
+from pydantic import Field
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Application settings, read from the environment and ``.env`` once per process."""
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    # tokens are signed with it; an empty key would let anyone sign them
+    secret: str = Field(min_length=1)
+
+    postgres_user: Optional[str] = None
+    postgres_password: Optional[str] = None
+    postgres_db: Optional[str] = None
+    postgres_host: Optional[str] = None
+    database_url: Optional[str] = None
+
+    catalog_reload_seconds: float = 30.0
+    partition_months_ahead: int = 3
+
+    access_token_minutes: int = 15
+    refresh_token_days: int = 14
+    revocation_sync_seconds: float = 5.0
+
+    # off, warn or strict; see services/query_budget.py
+    query_budgets: str = "off"
+
+    # staff-only profiling endpoints and the X-Profile header; nothing is
+    # registered unless enabled
+    profiling: bool = False
+
+    # order events are relayed by each worker when a sink is set, e.g.
+    # file:/var/log/order-events.jsonl or an http(s) URL
+    outbox_sink: Optional[str] = None
+    outbox_batch_size: int = 100
+    outbox_poll_seconds: float = 1.0
+
+    # the hash cost is calibrated once and stored unless password_hash_cost is set
+    password_scheme: str = "bcrypt"
+    password_hash_target_ms: float = 250.0
+    password_hash_cost: Optional[int] = None
+    argon2_memory_kib: int = 65536
+
+    # connection budget shared by all serving workers; the reserve is left
+    # for the archiver, migrations and admin sessions
+    web_concurrency: Optional[int] = None
+    postgres_max_connections: int = 100
+    db_reserved_connections: int = 10
+    db_pool_size: Optional[int] = None
+    db_max_overflow: int = 0
+
+    @property
+    def sqlalchemy_database_url(self) -> str:
+        if self.database_url:
+            return self.database_url
+        return (
+            f"postgresql://{self.postgres_user}:{self.postgres_password}"
+            f"@{self.postgres_host}/{self.postgres_db}"
+        )
+
+    @property
+    def workers(self) -> int:
+        return self.web_concurrency or os.cpu_count() or 1
+
+    def db_pool_limits(self) -> Tuple[int, int]:
+        """Per-worker (pool_size, max_overflow) that keeps every worker together under max_connections."""
+        budget = max(1, (self.postgres_max_connections - self.db_reserved_connections) // self.workers)
+        pool_size = min(self.db_pool_size or budget, budget)
+        max_overflow = min(self.db_max_overflow, budget - pool_size)
+        return pool_size, max_overflow
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings()
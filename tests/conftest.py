@@ -0,0 +1,78 @@
+"""Fixtures shared by the tests.
+
+Every test that takes ``client`` runs once against a throwaway SQLite file
+and once against PostgreSQL, when ``TEST_POSTGRES_URL`` names a database
+the tests may write to (an empty one, since rollups are checked across the
+whole database); without it the PostgreSQL run is skipped. Query budgets
+are enforced in strict mode, so a route over its budget fails any test
+that calls it.
+"""
+import os
+
+os.environ.setdefault("SECRET", "test-secret-" + "0" * 32)
+os.environ.setdefault("PASSWORD_HASH_COST", "4")
+os.environ["QUERY_BUDGETS"] = "strict"
+os.environ["PROFILING"] = "true"
+os.environ.pop("OUTBOX_SINK", None)
+
+import pytest
+from fastapi.testclient import TestClient
+from database import get_engine
+from settings import get_settings
+import main
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def database_url(request, tmp_path):
+    if request.param == "sqlite":
+        return f"sqlite:///{tmp_path / 'test.db'}"
+    url = os.environ.get("TEST_POSTGRES_URL")
+    if not url:
+        pytest.skip("TEST_POSTGRES_URL is not set")
+    return url
+
+
+@pytest.fixture
+def app(database_url, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", database_url)
+    get_settings.cache_clear()
+    get_engine.cache_clear()
+    yield main.create_app()
+    get_settings.cache_clear()
+    get_engine.cache_clear()
+
+
+@pytest.fixture
+def client(app):
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def signup(client):
+    """Sign up a user and return their auth headers and refresh token."""
+    suffix = os.urandom(4).hex()
+
+    def signup(username: str, is_staff: bool = False):
+        username = f"{username}-{suffix}"
+        response = client.post("/user/signup", json={
+            "username": username, "email": f"{username}@example.com", "first_name": "Test",
+            "last_name": "User", "password": "password", "is_staff": is_staff, "is_active": True,
+        })
+        assert response.status_code == 201, response.text
+        tokens = client.post("/auth/token", data={"username": username, "password": "password"}).json()
+        return {"Authorization": f"Bearer {tokens['access_token']}"}, tokens["refresh_token"]
+
+    return signup
+
+
+@pytest.fixture
+def menu_item(client, signup):
+    """Id of a menu item sold in every size."""
+    staff, _ = signup("menu-staff", is_staff=True)
+    response = client.post("/catalog/items", headers=staff, json={
+        "name": f"margherita-{os.urandom(4).hex()}",
+        "prices": {"small": 1000, "medium": 1400, "large": 1800, "extra_large": 2200},
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["item"]["id"]
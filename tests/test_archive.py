@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+from database import SessionLocal
+from services.archive import archive_batch
+
+
+def test_archiving_the_newest_order_does_not_free_its_id(client, signup, menu_item):
+    customer, _ = signup("customer")
+    staff, _ = signup("staff", is_staff=True)
+    later = datetime.utcnow() + timedelta(days=1)
+
+    def place_and_cancel():
+        order_id = client.post("/order/", headers=customer, json={"quantity": 1, "item_id": menu_item}).json()["order"]["id"]
+        response = client.put(f"/staff/{order_id}", headers=staff, params={"order_status": "cancelled"})
+        assert response.status_code == 201, response.text
+        return order_id
+
+    archived = place_and_cancel()
+    with SessionLocal() as db:
+        assert archive_batch(db, later) == 1
+
+    placed = place_and_cancel()
+    assert placed > archived
+    with SessionLocal() as db:
+        assert archive_batch(db, later) == 1
+
+    response = client.get(f"/order/{archived}/", headers=customer, params={"include_archived": True})
+    assert response.json()["order"]["id"] == archived
+
+
+def test_archived_orders_are_paged_with_the_live_ones(client, signup, menu_item):
+    customer, _ = signup("customer")
+    staff, _ = signup("staff", is_staff=True)
+    placed = [
+        client.post("/order/", headers=customer, json={"quantity": 1, "item_id": menu_item}).json()["order"]["id"]
+        for _ in range(5)
+    ]
+    for order_id in placed[1::2]:
+        client.put(f"/staff/{order_id}", headers=staff, params={"order_status": "delivered"})
+    with SessionLocal() as db:
+        archive_batch(db, datetime.utcnow() + timedelta(days=1))
+
+    pages, offset = [], 0
+    while offset is not None:
+        body = client.get("/order/", headers=customer, params={"include_archived": True, "limit": 2, "offset": offset}).json()
+        pages.append([(order["id"], "archived_at" in order) for order in body["orders"]])
+        offset = body["next_offset"]
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [order for page in pages for order in page] == [(order_id, order_id in placed[1::2]) for order_id in placed]
@@ -0,0 +1,27 @@
+import random
+from database import SessionLocal
+from services import hashing
+
+
+def test_calibration_is_stored_and_reused(client, monkeypatch):
+    calibrations = []
+
+    def calibrate(scheme, target_seconds, argon2_memory_kib):
+        calibrations.append(scheme)
+        return 10 + len(calibrations), target_seconds / 2
+
+    monkeypatch.setattr(hashing, "calibrate", calibrate)
+    # a target no other run has stored a cost for
+    target_ms = random.uniform(100, 1000)
+
+    with SessionLocal() as db:
+        assert hashing.calibrated_cost(db, "bcrypt", target_ms) == 11
+    with SessionLocal() as db:
+        assert hashing.configure_hashing("bcrypt", target_ms, db=db) == 11
+    assert calibrations == ["bcrypt"]
+
+    with SessionLocal() as db:
+        assert hashing.calibrated_cost(db, "bcrypt", target_ms, recalibrate=True) == 12
+    with SessionLocal() as db:
+        assert hashing.calibrated_cost(db, "bcrypt", target_ms) == 12
+    assert len(calibrations) == 2
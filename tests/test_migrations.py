@@ -0,0 +1,37 @@
+from sqlalchemy import create_engine, inspect, text
+import models
+from migrations import run_migrations
+
+
+# the tables as the first release created them
+FIRST_RELEASE = [
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, username VARCHAR(25) NOT NULL UNIQUE, email VARCHAR(100) NOT NULL UNIQUE,
+        first_name VARCHAR(100) NOT NULL, last_name VARCHAR(100) NOT NULL, password VARCHAR(100) NOT NULL,
+        is_staff BOOLEAN, is_active BOOLEAN)""",
+    """CREATE TABLE orders (
+        id INTEGER PRIMARY KEY, quantity INTEGER NOT NULL, order_status VARCHAR(10), pizza_size VARCHAR(11),
+        user_id INTEGER NOT NULL REFERENCES users (id))""",
+    "INSERT INTO users VALUES (1, 'old', 'old@example.com', 'Old', 'Customer', 'x', 0, 1)",
+    "INSERT INTO orders VALUES (1, 2, 'delivered', 'large', 1)",
+]
+
+
+def test_first_release_database_gains_every_column(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        for statement in FIRST_RELEASE:
+            conn.execute(text(statement))
+
+    run_migrations(engine)
+    run_migrations(engine)
+
+    inspector = inspect(engine)
+    for table in models.Base.metadata.sorted_tables:
+        assert {column["name"] for column in inspector.get_columns(table.name)} == set(table.columns.keys())
+    assert "ix_orders_created_at" in {index["name"] for index in inspector.get_indexes("orders")}
+
+    with engine.connect() as conn:
+        version, created_at = conn.execute(text("SELECT version, created_at FROM orders WHERE id = 1")).one()
+    assert version == 1
+    assert created_at is not None
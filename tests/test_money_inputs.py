@@ -0,0 +1,23 @@
+import os
+import pytest
+
+
+@pytest.mark.parametrize("quantity", [0, -5])
+def test_order_quantity_must_be_positive(client, signup, menu_item, quantity):
+    customer, _ = signup("customer")
+    order_id = client.post("/order/", headers=customer, json={"quantity": 1, "item_id": menu_item}).json()["order"]["id"]
+
+    assert client.post("/order/", headers=customer, json={"quantity": quantity, "item_id": menu_item}).status_code == 422
+    assert client.put(f"/order/{order_id}", headers=customer, json={"quantity": quantity}).status_code == 422
+    assert client.get(f"/order/{order_id}/", headers=customer).json()["order"]["quantity"] == 1
+
+
+def test_catalog_prices_cannot_be_negative(client, signup, menu_item):
+    staff, _ = signup("staff", is_staff=True)
+    name = f"negative-{os.urandom(4).hex()}"
+    prices = {"small": -1000, "medium": 1400, "large": 1800, "extra_large": 2200}
+
+    assert client.post("/catalog/items", headers=staff, json={"name": name, "prices": prices}).status_code == 422
+    assert client.put(f"/catalog/items/{menu_item}", headers=staff,
+                      json={"name": name, "prices": prices}).status_code == 422
+    assert client.post("/catalog/toppings", headers=staff, json={"name": name, "price": -150}).status_code == 422
@@ -0,0 +1,109 @@
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from fastapi.testclient import TestClient
+from database import SessionLocal
+from services.rollups import rebuild_rollups
+
+
+ORDERS = 3
+WRITERS_PER_SIDE = 4
+WRITES_PER_WRITER = 6
+MAX_ATTEMPTS = 200
+
+
+def test_concurrent_customer_and_staff_updates_lose_nothing(app, client, signup, menu_item):
+    customer, _ = signup("customer")
+    staff, _ = signup("staff", is_staff=True)
+    orders = []
+    for _ in range(ORDERS):
+        response = client.post("/order/", headers=customer, json={"quantity": 1, "item_id": menu_item})
+        assert response.status_code == 201, response.text
+        orders.append(response.json()["order"]["id"])
+
+    # not entered, so every request runs on its own event loop and requests
+    # from different threads really overlap, as they do across workers
+    hammer = TestClient(app)
+    lock = threading.Lock()
+    statuses = Counter()
+    increments = Counter()
+    writes = Counter()
+
+    def write_until_accepted(read, write):
+        for _ in range(MAX_ATTEMPTS):
+            current = read()
+            assert current.status_code == 200, current.text
+            response = write(current)
+            with lock:
+                statuses[response.status_code] += 1
+            if response.status_code != 409:
+                assert response.status_code in (200, 201), response.text
+                return
+        raise AssertionError(f"write still conflicting after {MAX_ATTEMPTS} attempts")
+
+    def customer_writer(writer):
+        for n in range(WRITES_PER_WRITER):
+            order_id = orders[(writer + n) % ORDERS]
+            write_until_accepted(
+                lambda: hammer.get(f"/order/{order_id}/", headers=customer),
+                lambda current: hammer.put(
+                    f"/order/{order_id}", headers={**customer, "If-Match": current.headers["etag"]},
+                    json={"quantity": current.json()["order"]["quantity"] + 1},
+                ),
+            )
+            with lock:
+                increments[order_id] += 1
+                writes[order_id] += 1
+
+    def staff_writer(writer):
+        for n in range(WRITES_PER_WRITER):
+            order_id = orders[(writer + n) % ORDERS]
+            write_until_accepted(
+                lambda: hammer.get(f"/staff/{order_id}", headers=staff),
+                lambda current: hammer.put(
+                    f"/staff/{order_id}", headers={**staff, "If-Match": current.headers["etag"]},
+                    params={"order_status": "pending" if current.json()["order"]["order_status"] == "processing"
+                            else "processing"},
+                ),
+            )
+            with lock:
+                writes[order_id] += 1
+
+    with ThreadPoolExecutor(max_workers=2 * WRITERS_PER_SIDE) as pool:
+        futures = [pool.submit(customer_writer, writer) for writer in range(WRITERS_PER_SIDE)]
+        futures += [pool.submit(staff_writer, writer) for writer in range(WRITERS_PER_SIDE)]
+        for future in futures:
+            future.result()
+
+    assert set(statuses) <= {200, 201, 409}
+    for order_id in orders:
+        order = client.get(f"/staff/{order_id}", headers=staff).json()["order"]
+        # every accepted read-modify-write is in the final row
+        assert order["quantity"] == 1 + increments[order_id]
+        assert order["version"] == 1 + writes[order_id]
+
+    with SessionLocal() as db:
+        assert rebuild_rollups(db, check_only=True) == []
+
+
+def test_stale_if_match_is_rejected(client, signup, menu_item):
+    customer, _ = signup("customer")
+    staff, _ = signup("staff", is_staff=True)
+    order = client.post("/order/", headers=customer, json={"quantity": 1, "item_id": menu_item}).json()["order"]
+    stale = {"If-Match": f'"{order["version"]}"'}
+
+    response = client.put(f"/staff/{order['id']}", headers=staff, params={"order_status": "processing"})
+    assert response.status_code == 201, response.text
+
+    response = client.put(f"/order/{order['id']}", headers={**customer, **stale}, json={"quantity": 5})
+    assert response.status_code == 409
+    response = client.put(f"/staff/{order['id']}", headers={**staff, **stale}, params={"order_status": "shipped"})
+    assert response.status_code == 409
+    response = client.delete(f"/order/{order['id']}", headers={**customer, **stale})
+    assert response.status_code == 409
+
+    current = client.get(f"/staff/{order['id']}", headers=staff).json()["order"]
+    assert (current["quantity"], current["order_status"], current["version"]) == (1, "processing", 2)
+
+    with SessionLocal() as db:
+        assert rebuild_rollups(db, check_only=True) == []
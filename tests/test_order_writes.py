@@ -0,0 +1,48 @@
+import re
+import pytest
+from sqlalchemy import event
+from database import get_engine
+
+
+# \b keeps order_events, orders_archive and the partitions out
+ORDERS = re.compile(r"\borders\b", re.IGNORECASE)
+
+# PostgreSQL reads the previous values inside the UPDATE itself. SQLite's
+# RETURNING only sees the updated row, so it reads the row first and then
+# updates it guarded by the version it read.
+READS_BEFORE_WRITE = {"postgresql": 0, "sqlite": 1}
+
+# (client, order id, item id, customer headers, staff headers) -> response
+WRITES = {
+    "customer update": lambda client, id, item, customer, staff: client.put(
+        f"/order/{id}", headers=customer, json={"quantity": 3, "pizza_size": "large"}),
+    "customer update with item": lambda client, id, item, customer, staff: client.put(
+        f"/order/{id}", headers=customer, json={"quantity": 2, "pizza_size": "medium", "item_id": item}),
+    "status update": lambda client, id, item, customer, staff: client.put(
+        f"/staff/{id}", headers=staff, params={"order_status": "processing"}),
+    "customer delete": lambda client, id, item, customer, staff: client.delete(f"/order/{id}", headers=customer),
+    "staff delete": lambda client, id, item, customer, staff: client.delete(f"/staff/{id}", headers=staff),
+}
+
+
+@pytest.mark.parametrize("write", WRITES)
+def test_order_write_is_one_update(client, signup, menu_item, write):
+    customer, _ = signup("customer")
+    staff, _ = signup("staff", is_staff=True)
+    order_id = client.post("/order/", headers=customer, json={"quantity": 1, "item_id": menu_item}).json()["order"]["id"]
+
+    engine = get_engine()
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if ORDERS.search(statement):
+            statements.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = WRITES[write](client, order_id, menu_item, customer, staff)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert response.status_code < 300, response.text
+    assert statements == ["SELECT"] * READS_BEFORE_WRITE[engine.dialect.name] + ["UPDATE"]
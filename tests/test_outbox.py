@@ -0,0 +1,81 @@
+import queue
+import pytest
+from database import SessionLocal
+from services.outbox import ORDER_CREATED, ORDER_STATUS_CHANGED, OutboxRelay, QueueSink, make_sink, outbox_backlog
+
+
+class FailingSink:
+    def send(self, events):
+        raise ConnectionError("sink is down")
+
+
+def place_orders(client, signup, menu_item, count):
+    customer, _ = signup("customer")
+    return [
+        client.post("/order/", headers=customer, json={"quantity": 1, "item_id": menu_item}).json()["order"]["id"]
+        for _ in range(count)
+    ]
+
+
+def drain_everything(sink):
+    relay = OutboxRelay(SessionLocal, sink, batch_size=2)
+    relay.drain()
+    return relay
+
+
+def test_relay_delivers_each_event_once_in_order(client, signup, menu_item):
+    drain_everything(QueueSink())
+    staff, _ = signup("staff", is_staff=True)
+    orders = place_orders(client, signup, menu_item, 3)
+    client.put(f"/staff/{orders[0]}", headers=staff, params={"order_status": "processing"})
+
+    sink = QueueSink()
+    relay = drain_everything(sink)
+    events = list(sink.events.queue)
+
+    assert [(event["type"], event["order_id"]) for event in events] == [
+        *[(ORDER_CREATED, order_id) for order_id in orders], (ORDER_STATUS_CHANGED, orders[0]),
+    ]
+    assert [event["id"] for event in events] == sorted(event["id"] for event in events)
+    assert relay.metrics()["delivered"] == 4
+    with SessionLocal() as db:
+        assert outbox_backlog(db)["pending"] == 0
+
+
+def test_rejected_batch_is_kept_and_retried(client, signup, menu_item):
+    drain_everything(QueueSink())
+    orders = place_orders(client, signup, menu_item, 2)
+
+    with pytest.raises(ConnectionError):
+        OutboxRelay(SessionLocal, FailingSink()).drain_once()
+    with SessionLocal() as db:
+        assert outbox_backlog(db)["pending"] == 2
+
+    sink = QueueSink()
+    drain_everything(sink)
+    assert [event["order_id"] for event in sink.events.queue] == orders
+
+
+def test_other_relays_skip_while_a_batch_is_being_delivered(client, signup, menu_item):
+    drain_everything(QueueSink())
+    place_orders(client, signup, menu_item, 3)
+    seen_by_other_relay = []
+
+    class CheckingSink(QueueSink):
+        def send(self, events):
+            # the claim is committed, so this returns at once instead of
+            # waiting for the batch to be delivered
+            seen_by_other_relay.append(OutboxRelay(SessionLocal, QueueSink()).claim())
+            super().send(events)
+
+    sink = CheckingSink()
+    OutboxRelay(SessionLocal, sink, batch_size=10).drain_once()
+
+    assert seen_by_other_relay == [[]]
+    assert sink.events.qsize() == 3
+
+
+def test_queue_is_not_a_configurable_sink():
+    with pytest.raises(ValueError):
+        make_sink("queue")
+    assert isinstance(QueueSink().events, queue.Queue)
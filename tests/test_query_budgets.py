@@ -0,0 +1,89 @@
+"""Every route stays within its query budget (see services/query_budget.py).
+
+The tour calls every route once, the way a client would. Budgets are strict
+in the tests, so a request over its route's budget, or to a route without
+one, fails the request and with it the test. Run this after changing a
+router or services/auth.py, and raise a budget only together with the
+change that needs it.
+"""
+import os
+from fastapi.routing import APIRoute
+from services import query_budget
+from services.query_budget import budget_of, route_name
+
+
+def tour(client, signup):
+    """Call every route at least once."""
+    suffix = os.urandom(4).hex()
+
+    client.get("/")
+    customer, refresh = signup("budget-customer")
+    staff, _ = signup("budget-staff", is_staff=True)
+    username = client.get("/user/me", headers=customer).json()["user"]["username"]
+    client.post("/user/login", json={"username": username, "password": "password"})
+    client.put("/user/", headers=customer, json={
+        "username": username, "email": f"{username}@example.com",
+        "first_name": "Query", "last_name": "Budget", "address": "1 Budget Street",
+        "latitude": 6.45, "longitude": 3.39,
+    })
+
+    client.get("/catalog/")
+    item = client.post("/catalog/items", headers=staff, json={
+        "name": f"budget-{suffix}", "prices": {"small": 1000, "medium": 1400, "large": 1800, "extra_large": 2200},
+    }).json()["item"]
+    client.put(f"/catalog/items/{item['id']}", headers=staff, json={
+        "name": f"budget-{suffix}", "prices": {"small": 1100, "medium": 1500, "large": 1900, "extra_large": 2300},
+    })
+    topping = client.post("/catalog/toppings", headers=staff, json={"name": f"budget-{suffix}", "price": 150}).json()
+    client.put(f"/catalog/toppings/{topping['topping']['id']}", headers=staff,
+               json={"name": f"budget-{suffix}", "price": 200})
+
+    orders = [
+        client.post("/order/", headers=customer, json={"quantity": 2, "item_id": item["id"]}).json()["order"]["id"]
+        for _ in range(3)
+    ]
+    client.get("/order/", headers=customer, params={"include_archived": True})
+    client.get(f"/order/{orders[0]}/", headers=customer)
+    client.put(f"/order/{orders[0]}", headers=customer, json={"quantity": 3, "pizza_size": "large"})
+    client.delete(f"/order/{orders[1]}", headers=customer)
+
+    client.get("/staff/", headers=staff, params={"include_archived": True})
+    client.get(f"/staff/{orders[0]}", headers=staff)
+    client.put(f"/staff/{orders[0]}", headers=staff, params={"order_status": "processing"})
+    client.get("/staff/dispatch/plan", headers=staff, params={"depot_lat": 6.5, "depot_lon": 3.4})
+    client.get("/staff/reports/revenue", headers=staff)
+    client.get("/staff/outbox", headers=staff)
+    client.get("/staff/search", headers=staff, params={"q": username})
+    client.delete(f"/staff/{orders[2]}", headers=staff)
+
+    profile_id = client.get("/staff/outbox", headers={**staff, "X-Profile": "1"}).headers["x-profile-id"]
+    client.get("/admin/profile", headers=staff, params={"seconds": 0.1})
+    client.get("/admin/profile/requests", headers=staff)
+    client.get(f"/admin/profile/requests/{profile_id}", headers=staff)
+
+    refreshed = client.post("/auth/refresh", json={"refresh_token": refresh}).json()
+    client.post("/auth/revoke", headers={"Authorization": f"Bearer {refreshed['access_token']}"},
+                json={"refresh_token": refreshed["refresh_token"]})
+
+
+def test_every_route_is_within_its_budget(app, client, signup, monkeypatch):
+    # usage is kept per process; only count this tour
+    monkeypatch.setattr(query_budget, "_usage", {})
+
+    def succeeded(response):
+        # a usage figure taken from an error path says nothing about the route
+        response.read()
+        response.raise_for_status()
+
+    client.event_hooks["response"] = [succeeded]
+    tour(client, signup)
+
+    usage = query_budget.route_usage()
+    for route in app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        name = route_name(route)
+        budget = budget_of(route.endpoint)
+        assert budget is not None, f"{name} has no query budget"
+        assert budget.rows is not None, f"{name} has no rows budget"
+        assert name in usage, f"{name} is not called by the tour"
@@ -0,0 +1,44 @@
+from datetime import datetime, timedelta
+from services.revocation import Denylist
+
+
+NOW = datetime(2026, 1, 1)
+SAMPLES = 20_000
+
+
+def false_positive_rate(denylist):
+    return sum(f"never-revoked-{n}" in denylist._bloom for n in range(SAMPLES)) / SAMPLES
+
+
+def test_revoked_ids_are_members_until_pruned():
+    denylist = Denylist(capacity=100)
+    denylist.add([("expired", NOW - timedelta(minutes=1)), ("live", NOW + timedelta(minutes=1))])
+    denylist.add([("live", NOW + timedelta(hours=1))])
+
+    assert len(denylist) == 2
+    assert "expired" in denylist and "live" in denylist
+    assert "other" not in denylist
+
+    assert denylist.prune(NOW) == 1
+    assert "expired" not in denylist and "live" in denylist
+    assert denylist.prune(NOW) == 0
+
+
+def test_bulk_add_grows_the_filter_to_fit():
+    denylist = Denylist(capacity=1_000, error_rate=0.001)
+    # one add far past capacity, like the first sync of a worker
+    denylist.add((f"revoked-{n}", NOW + timedelta(hours=1)) for n in range(20_000))
+
+    assert denylist._bloom.capacity >= 2 * len(denylist)
+    assert all(f"revoked-{n}" in denylist for n in range(20_000))
+    assert false_positive_rate(denylist) <= 2 * denylist.error_rate
+
+
+def test_growth_keeps_the_error_rate_after_repeated_adds():
+    denylist = Denylist(capacity=1_000, error_rate=0.001)
+    for batch in range(10):
+        denylist.add((f"revoked-{batch}-{n}", NOW + timedelta(hours=1)) for n in range(500))
+
+    assert len(denylist) == 5_000
+    assert denylist._bloom.capacity >= len(denylist)
+    assert false_positive_rate(denylist) <= 2 * denylist.error_rate